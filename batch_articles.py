@@ -0,0 +1,44 @@
+"""
+Scrape many article URLs concurrently from the command line.
+
+    python batch_articles.py urls.txt            # one URL per line
+    python batch_articles.py -u URL -u URL
+    cat urls.txt | python batch_articles.py -
+
+Results are printed as NDJSON, one line per URL as soon as it finishes.
+"""
+import argparse
+import json
+import sys
+
+from web1 import scrape_articles, ARTICLE_BATCH_WORKERS, ARTICLE_BATCH_PER_HOST
+
+def read_urls(path):
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with stream:
+        return [line.strip() for line in stream if line.strip() and not line.startswith("#")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape article text from many URLs.")
+    parser.add_argument("file", nargs="?", help="file with one URL per line, or - for stdin")
+    parser.add_argument("-u", "--url", action="append", default=[], help="URL to scrape (repeatable)")
+    parser.add_argument("--workers", type=int, default=ARTICLE_BATCH_WORKERS)
+    parser.add_argument("--per-host", type=int, default=ARTICLE_BATCH_PER_HOST)
+    parser.add_argument("--no-cache", action="store_true", help="bypass the article cache")
+    args = parser.parse_args()
+
+    urls = list(args.url)
+    if args.file:
+        urls.extend(read_urls(args.file))
+    if not urls:
+        parser.error("no URLs given")
+
+    failed = 0
+    for result in scrape_articles(urls, args.workers, args.per_host, use_cache=not args.no_cache):
+        failed += "error" in result
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
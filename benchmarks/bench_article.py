@@ -0,0 +1,83 @@
+"""
+Compare the article extraction engines on accuracy and speed.
+
+    python benchmarks/bench_article.py [--repeat N] [page.html ...]
+
+Without arguments the pages in benchmarks/fixtures are used: the real
+saved_*.html pages and the generated ones. Accuracy is word-level
+precision / recall / F1 against page.txt next to each page (pages without
+one are timed only), and the mean F1 of each engine is reported for the
+saved and the generated pages separately. Time is the best of N runs.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import web1
+from html_fixtures import ensure_fixtures
+
+def words(text):
+    return Counter(re.findall(r"\w+", text.lower()))
+
+def score(extracted, reference):
+    """
+    (precision, recall, F1) of extracted's words against reference's.
+    """
+    got, want = words(extracted), words(reference)
+    overlap = sum((got & want).values())
+    precision = overlap / sum(got.values()) if got else 0.0
+    recall = overlap / sum(want.values()) if want else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if overlap else 0.0
+    return precision, recall, f1
+
+def best_time(func, content, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(content)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pages", nargs="*", help="HTML files (default: benchmarks/fixtures)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = args.pages or ensure_fixtures()
+    print(f"heuristic parser: {web1.resolve_parser('auto')}")
+    print(f"{'page':<32}{'KB':>8}  {'engine':<11}{'ms':>9}{'prec':>7}{'recall':>7}{'F1':>7}")
+    f1s = defaultdict(list)
+    for path in pages:
+        with open(path, "rb") as f:
+            content = f.read()
+        reference_path = os.path.splitext(path)[0] + ".txt"
+        reference = None
+        if os.path.exists(reference_path):
+            with open(reference_path, encoding="utf-8") as f:
+                reference = f.read()
+        for engine in web1.ARTICLE_ENGINES:
+            elapsed, text = best_time(
+                lambda c: web1.extract_article_text(c, engine=engine), content, args.repeat)
+            accuracy = ""
+            if reference:
+                scores = score(text, reference)
+                accuracy = "".join(f"{value:>7.3f}" for value in scores)
+                group = "generated" if os.path.basename(path).startswith("generated_") else "saved"
+                f1s[group, engine].append(scores[2])
+            print(f"{os.path.basename(path):<32}{len(content) / 1024:>8.0f}  {engine:<11}"
+                  f"{elapsed * 1000:>9.2f}{accuracy}")
+
+    if f1s:
+        print(f"\n{'pages':<12}{'engine':<11}{'count':>6}{'mean F1':>9}")
+        for (group, engine), values in sorted(f1s.items()):
+            print(f"{group:<12}{engine:<11}{len(values):>6}{sum(values) / len(values):>9.3f}")
+
+if __name__ == "__main__":
+    main()
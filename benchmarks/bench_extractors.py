@@ -0,0 +1,212 @@
+"""
+Benchmark every extractor on local fixtures and write the results as JSON.
+
+    python benchmarks/bench_extractors.py [--repeat N] [--only NAME ...] [-o results.json]
+                                          [--latency-ms 20] [--bandwidth-kbps 20480]
+                                          [--baseline old.json] [--tolerance 1.25]
+
+Documents come from doc_fixtures, web pages from html_fixtures served by
+mock_server (with the given latency and bandwidth), and transcripts from a
+StubTranscriptFetcher, so runs need no network and are repeatable. Each
+extractor runs in its own subprocess so the peak RSS reported is its own.
+For every fixture the JSON holds each run's time, p50/p95 and throughput
+in input MB/s and items (images, pages, segments) per second. With
+--baseline the p50s are compared against an earlier results file and the
+exit status is 1 if any case slowed down by more than --tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from doc_fixtures import ensure_doc_fixtures
+from html_fixtures import ensure_fixtures
+from mock_server import start_server
+
+EXTRACTORS = ("scrape_article", "scrape_images", "extract_images_from_zip",
+              "extract_images_from_pdf", "get_youtube_transcript")
+TRANSCRIPT_SEGMENTS = (100, 1000, 10000)
+MEDIA_FOLDERS = {".docx": "word/media/", ".pptx": "ppt/media/"}
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of a non-empty list.
+    """
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * fraction // 1))
+    return ordered[int(rank) - 1]
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is in KiB on Linux and in bytes on macOS.
+    rss = resource.getrusage(who).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def transcript_segments(count):
+    return [{"text": f"segment {i} of the benchmark transcript", "start": i * 2.5, "duration": 2.5}
+            for i in range(count)]
+
+def cases(extractor, server_url):
+    """
+    (name, input bytes, run) for every fixture of extractor, where run()
+    does the work once and returns how many items it produced.
+    """
+    import web1
+
+    if extractor in ("scrape_article", "scrape_images"):
+        for path in ensure_fixtures():
+            name = os.path.basename(path)
+            url = f"{server_url}/pages/{name}"
+            if extractor == "scrape_article":
+                run = lambda url=url: bool(web1.scrape_article(url, use_cache=False))
+            else:
+                def run(url=url):
+                    with tempfile.TemporaryDirectory() as folder:
+                        return web1.scrape_images(url, folder)
+            yield name, os.path.getsize(path), run
+    elif extractor in ("extract_images_from_zip", "extract_images_from_pdf"):
+        fixtures = ensure_doc_fixtures()
+        paths = fixtures["pdf"] if extractor == "extract_images_from_pdf" else fixtures["docx"] + fixtures["pptx"]
+        for path in paths:
+            def run(path=path):
+                with tempfile.TemporaryDirectory() as folder:
+                    if extractor == "extract_images_from_pdf":
+                        return web1.extract_images_from_pdf(path, folder)
+                    return web1.extract_images_from_zip(path, MEDIA_FOLDERS[os.path.splitext(path)[1]], folder)
+            yield os.path.basename(path), os.path.getsize(path), run
+    elif extractor == "get_youtube_transcript":
+        # The cache would turn every repeat into a lookup, so this times
+        # the uncached path get_youtube_transcript takes on a miss.
+        for count in TRANSCRIPT_SEGMENTS:
+            video_id = f"bench{count:06d}"
+            segments = transcript_segments(count)
+            web1.TRANSCRIPT_FETCHER = web1.StubTranscriptFetcher({video_id: segments})
+            run = lambda video_id=video_id: len(web1.fetch_transcript(video_id, use_cache=False))
+            yield f"stub_{count}_segments", len(json.dumps(segments)), run
+    else:
+        raise ValueError(f"Unknown extractor: {extractor}")
+
+def run_worker(extractor, server_url, repeat, warmup):
+    """
+    Subprocess entry point: time every case of one extractor.
+    """
+    import web1  # noqa: F401  (imported before measuring the baseline RSS)
+
+    result = {"extractor": extractor, "baseline_rss_mb": peak_rss_mb(), "cases": []}
+    for name, size, run in cases(extractor, server_url):
+        for _ in range(warmup):
+            run()
+        times = []
+        items = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            items = run()
+            times.append(time.perf_counter() - start)
+        p50 = percentile(times, 0.5)
+        result["cases"].append({
+            "fixture": name,
+            "input_bytes": size,
+            "items": int(items),
+            "runs": [round(t, 6) for t in times],
+            "p50_ms": round(p50 * 1000, 3),
+            "p95_ms": round(percentile(times, 0.95) * 1000, 3),
+            "mean_ms": round(sum(times) / len(times) * 1000, 3),
+            "mb_per_s": round(size / p50 / (1024 * 1024), 2) if p50 else None,
+            "items_per_s": round(items / p50, 1) if p50 else None,
+        })
+    result["peak_rss_mb"] = peak_rss_mb()
+    result["children_peak_rss_mb"] = peak_rss_mb(resource.RUSAGE_CHILDREN)
+    return result
+
+def compare(results, baseline, tolerance):
+    """
+    Print p50 ratios against a baseline run; return the regressions.
+    """
+    old = {
+        (name, case["fixture"]): case["p50_ms"]
+        for name, extractor in baseline.get("extractors", {}).items()
+        for case in extractor["cases"]
+    }
+    regressions = []
+    print(f"\n{'extractor':<26}{'fixture':<30}{'old ms':>10}{'new ms':>10}{'ratio':>8}")
+    for name, extractor in results["extractors"].items():
+        for case in extractor["cases"]:
+            before = old.get((name, case["fixture"]))
+            if not before:
+                continue
+            ratio = case["p50_ms"] / before
+            flag = "  SLOWER" if ratio > tolerance else ""
+            print(f"{name:<26}{case['fixture']:<30}{before:>10.2f}{case['p50_ms']:>10.2f}{ratio:>8.2f}{flag}")
+            if flag:
+                regressions.append((name, case["fixture"], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--only", nargs="+", choices=EXTRACTORS, help="extractors to run (default: all)")
+    parser.add_argument("-o", "--output", default="bench_extractors.json", help="JSON results file")
+    parser.add_argument("--latency-ms", type=float, default=20, help="mock server latency per response")
+    parser.add_argument("--bandwidth-kbps", type=float, default=20480,
+                        help="mock server KiB per second per response (0: unlimited)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="largest p50 ratio to the baseline that is not a regression")
+    parser.add_argument("--worker", choices=EXTRACTORS, help=argparse.SUPPRESS)
+    parser.add_argument("--server", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.server, args.repeat, args.warmup)))
+        return 0
+
+    # Generate fixtures once, up front, so no worker times their creation.
+    ensure_fixtures()
+    ensure_doc_fixtures()
+    server = start_server(args.latency_ms / 1000, args.bandwidth_kbps * 1024 or None)
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"repeat": args.repeat, "warmup": args.warmup, "latency_ms": args.latency_ms,
+                     "bandwidth_kbps": args.bandwidth_kbps},
+        "extractors": {},
+    }
+    print(f"{'extractor':<26}{'fixture':<30}{'KB':>8}{'items':>7}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'MB/s':>8}{'items/s':>10}{'RSS MB':>8}")
+    try:
+        for extractor in args.only or EXTRACTORS:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", extractor, "--server", server.url,
+                 "--repeat", str(args.repeat), "--warmup", str(args.warmup)],
+                check=True, stdout=subprocess.PIPE, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+            ).stdout
+            # Imports may print warnings to stdout; the result is the last line.
+            result = json.loads(output.splitlines()[-1])
+            results["extractors"][extractor] = result
+            for case in result["cases"]:
+                print(f"{extractor:<26}{case['fixture']:<30}{case['input_bytes'] / 1024:>8.0f}{case['items']:>7}"
+                      f"{case['p50_ms']:>10.2f}{case['p95_ms']:>10.2f}{case['mb_per_s'] or 0:>8.2f}"
+                      f"{case['items_per_s'] or 0:>10.1f}{result['peak_rss_mb']:>8.1f}")
+    finally:
+        server.shutdown()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nwrote {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Compare the HTML parser backends used by scrape_article and scrape_images.
+
+    python benchmarks/bench_parsers.py [--repeat N] [--mode M] [page.html ...]
+
+Without arguments the pages in benchmarks/fixtures and the small malformed
+pages in html_fixtures.MALFORMED_PAGES are used. Every backend's output is
+checked against html.parser, the reference (and what HTML_PARSER=auto
+uses): the heuristic and density article text against its full parse,
+and every attribute of every <img> against its parse in the same mode
+(targeted mode skips images inside SKIPPED_TAGS on purpose). The exit
+status is 1 if anything differs.
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+from bs4 import XMLParsedAsHTMLWarning
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import web1
+from html_fixtures import MALFORMED_PAGES, ensure_fixtures
+
+def best_time(func, content, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(content)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def outputs(content, backend, mode, repeat):
+    """
+    (article ms, images ms, {"text", "density", "images"}) for one backend.
+    """
+    article_time, text = best_time(
+        lambda c: web1.extract_article_text(c, parser=backend, mode=mode, engine="heuristic"), content, repeat)
+    image_time, images = best_time(
+        lambda c: web1.parse_image_tags(c, parser=backend, mode=mode), content, repeat)
+    density = web1.extract_article(content, engine="density", parser=backend)["text"]
+    return article_time, image_time, {"text": text, "density": density, "images": images}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pages", nargs="*", help="HTML files (default: benchmarks/fixtures and MALFORMED_PAGES)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mode", choices=["full", "targeted", "both"], default="both",
+                        help="parse mode(s) to time (default: both)")
+    args = parser.parse_args()
+    # Saved XHTML pages are parsed as HTML on purpose.
+    warnings.simplefilter("ignore", XMLParsedAsHTMLWarning)
+
+    if args.pages:
+        pages = []
+        for path in args.pages:
+            with open(path, "rb") as f:
+                pages.append((os.path.basename(path), f.read()))
+    else:
+        pages = []
+        for path in ensure_fixtures():
+            with open(path, "rb") as f:
+                pages.append((os.path.basename(path), f.read()))
+        pages += [(f"malformed:{name}", page.encode()) for name, page in MALFORMED_PAGES.items()]
+    modes = ["full", "targeted"] if args.mode == "both" else [args.mode]
+    backends = web1.available_parsers()
+    print(f"backends: {', '.join(backends)} (auto = {web1.resolve_parser('auto')})")
+    print(f"{'page':<36}{'KB':>6}  {'parser':<12}{'mode':<10}{'article ms':>11}{'images ms':>11}"
+          f"  {'text':<6}{'density':<9}{'images':<6}")
+    differences = []
+    for name, content in pages:
+        full = outputs(content, "html.parser", "full", 1)[2]
+        for mode in modes:
+            reference = dict(full, images=outputs(content, "html.parser", mode, 1)[2]["images"])
+            for backend in reversed(backends):
+                article_time, image_time, result = outputs(content, backend, mode, args.repeat)
+                same = {key: result[key] == reference[key] for key in reference}
+                for key in reference:
+                    if not same[key]:
+                        differences.append((name, backend, mode, key, reference[key], result[key]))
+                print(f"{name:<36}{len(content) / 1024:>6.0f}  {backend:<12}{mode:<10}"
+                      f"{article_time * 1000:>11.2f}{image_time * 1000:>11.2f}"
+                      f"  {'yes' if same['text'] else 'NO':<6}{'yes' if same['density'] else 'NO':<9}"
+                      f"{'yes' if same['images'] else 'NO':<6}")
+
+    if differences:
+        print(f"\n{len(differences)} outputs differ from html.parser:")
+        for name, backend, mode, key, want, got in differences:
+            print(f"  {name} {backend} {mode} {key}:\n    html.parser: {want!r:.200}\n    {backend}: {got!r:.200}")
+    return 1 if differences else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
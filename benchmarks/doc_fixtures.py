@@ -0,0 +1,162 @@
+"""
+Deterministic PDF, DOCX and PPTX files used by the benchmarks.
+
+Each size is a number of pages (paragraph groups in DOCX, slides in PPTX),
+a number of images per page and the images' edge length in pixels. The
+images are seeded noise PNGs, so they neither compress away nor repeat,
+except for one logo that appears on every page the way real documents
+reuse a letterhead; extractors are expected to write it once.
+"""
+import os
+import random
+import struct
+import zipfile
+import zlib
+
+import fitz  # PyMuPDF
+
+from html_fixtures import FIXTURES_DIR, _sentence
+
+# name -> (pages, images per page, image size in pixels)
+DOC_SIZES = {
+    "small": (5, 1, 64),
+    "medium": (50, 2, 96),
+    "large": (300, 3, 128),
+}
+DOC_FORMATS = ("pdf", "docx", "pptx")
+
+def png_bytes(rng, size):
+    """
+    A size x size RGB PNG of random noise.
+    """
+    row = size * 3
+    raw = b"".join(b"\x00" + rng.randbytes(row) for _ in range(size))
+    def chunk(kind, data):
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw, 1)) + chunk(b"IEND", b""))
+
+def _page_images(rng, pages, per_page, size):
+    return [[png_bytes(rng, size) for _ in range(per_page)] for _ in range(pages)]
+
+def write_pdf(path, pages, per_page, size, seed=0):
+    rng = random.Random(seed)
+    logo = png_bytes(rng, 32)
+    images = _page_images(rng, pages, per_page, size)
+    doc = fitz.open()
+    for page_images in images:
+        page = doc.new_page()
+        page.insert_image(fitz.Rect(36, 20, 68, 52), stream=logo)
+        page.insert_textbox(fitz.Rect(36, 60, 560, 300),
+                            " ".join(_sentence(rng, 14) for _ in range(12)), fontsize=10)
+        for i, image in enumerate(page_images):
+            x = 36 + (i % 3) * 180
+            y = 320 + (i // 3) * 180
+            page.insert_image(fitz.Rect(x, y, x + 160, y + 160), stream=image)
+    doc.set_metadata({"title": f"Benchmark {pages} pages", "author": "Benchmarks"})
+    doc.save(path)
+    doc.close()
+
+NS_W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+NS_P = "http://schemas.openxmlformats.org/presentationml/2006/main"
+NS_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+REL_IMAGE = NS_R + "/image"
+
+CORE_XML = (
+    '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+    'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/">'
+    '<dc:title>Benchmark document</dc:title><dc:creator>Benchmarks</dc:creator>'
+    '<dcterms:created>2024-01-01T00:00:00Z</dcterms:created></cp:coreProperties>'
+)
+CONTENT_TYPES = (
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Default Extension="png" ContentType="image/png"/></Types>'
+)
+
+def _rels(targets):
+    items = "".join(f'<Relationship Id="{rid}" Type="{kind}" Target="{target}"/>'
+                    for rid, kind, target in targets)
+    return f'<Relationships xmlns="{NS_REL}">{items}</Relationships>'
+
+def _blip(rid):
+    return (f'<a:graphic><a:graphicData><a:blip r:embed="{rid}"/></a:graphicData></a:graphic>')
+
+def write_docx(path, pages, per_page, size, seed=0):
+    rng = random.Random(seed)
+    logo = png_bytes(rng, 32)
+    images = _page_images(rng, pages, per_page, size)
+    rels = [("rIdLogo", REL_IMAGE, "media/logo.png")]
+    body = []
+    for page, page_images in enumerate(images):
+        body.append(f'<w:p><w:r><w:drawing>{_blip("rIdLogo")}</w:drawing></w:r></w:p>')
+        for _ in range(6):
+            body.append(f'<w:p><w:r><w:t>{_sentence(rng, 14)} {_sentence(rng, 10)}</w:t></w:r></w:p>')
+        for i in range(len(page_images)):
+            rid = f"rIdImg{page}_{i}"
+            rels.append((rid, REL_IMAGE, f"media/image{page}_{i}.png"))
+            body.append(f'<w:p><w:r><w:drawing>{_blip(rid)}</w:drawing></w:r></w:p>')
+    document = (f'<w:document xmlns:w="{NS_W}" xmlns:a="{NS_A}" xmlns:r="{NS_R}">'
+                f'<w:body>{"".join(body)}</w:body></w:document>')
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml", CONTENT_TYPES)
+        z.writestr("_rels/.rels", _rels([("rId1", NS_R + "/officeDocument", "word/document.xml")]))
+        z.writestr("docProps/core.xml", CORE_XML)
+        z.writestr("word/document.xml", document)
+        z.writestr("word/_rels/document.xml.rels", _rels(rels))
+        # Images are already compressed; store them like Word does.
+        z.writestr("word/media/logo.png", logo, zipfile.ZIP_STORED)
+        for page, page_images in enumerate(images):
+            for i, image in enumerate(page_images):
+                z.writestr(f"word/media/image{page}_{i}.png", image, zipfile.ZIP_STORED)
+
+def write_pptx(path, pages, per_page, size, seed=0):
+    rng = random.Random(seed)
+    logo = png_bytes(rng, 32)
+    images = _page_images(rng, pages, per_page, size)
+    ns = f'xmlns:p="{NS_P}" xmlns:a="{NS_A}" xmlns:r="{NS_R}"'
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml", CONTENT_TYPES)
+        z.writestr("_rels/.rels", _rels([("rId1", NS_R + "/officeDocument", "ppt/presentation.xml")]))
+        z.writestr("docProps/core.xml", CORE_XML)
+        slide_ids = "".join(f'<p:sldId id="{256 + n}" r:id="rId{n + 1}"/>' for n in range(pages))
+        z.writestr("ppt/presentation.xml", f'<p:presentation {ns}><p:sldIdLst>{slide_ids}</p:sldIdLst></p:presentation>')
+        z.writestr("ppt/_rels/presentation.xml.rels",
+                   _rels([(f"rId{n + 1}", NS_R + "/slide", f"slides/slide{n + 1}.xml") for n in range(pages)]))
+        z.writestr("ppt/media/logo.png", logo, zipfile.ZIP_STORED)
+        for n, page_images in enumerate(images):
+            text = "".join(f'<a:p><a:r><a:t>{_sentence(rng, 10)}</a:t></a:r></a:p>' for _ in range(5))
+            pictures = "".join(f'<p:pic><p:blipFill><a:blip r:embed="rIdImg{i}"/></p:blipFill></p:pic>'
+                               for i in range(len(page_images)))
+            z.writestr(f"ppt/slides/slide{n + 1}.xml",
+                       f'<p:sld {ns}><p:cSld><p:spTree><p:sp><p:txBody>{text}</p:txBody></p:sp>'
+                       f'<p:pic><p:blipFill><a:blip r:embed="rIdLogo"/></p:blipFill></p:pic>'
+                       f'{pictures}</p:spTree></p:cSld></p:sld>')
+            rels = [("rIdLogo", REL_IMAGE, "../media/logo.png")]
+            for i, image in enumerate(page_images):
+                rels.append((f"rIdImg{i}", REL_IMAGE, f"../media/image{n + 1}_{i}.png"))
+                z.writestr(f"ppt/media/image{n + 1}_{i}.png", image, zipfile.ZIP_STORED)
+            z.writestr(f"ppt/slides/_rels/slide{n + 1}.xml.rels", _rels(rels))
+
+WRITERS = {"pdf": write_pdf, "docx": write_docx, "pptx": write_pptx}
+
+def ensure_doc_fixtures(folder=FIXTURES_DIR):
+    """
+    Write the generated documents into folder (once) and return
+    {format: [paths, smallest first]}.
+    """
+    os.makedirs(folder, exist_ok=True)
+    paths = {fmt: [] for fmt in DOC_FORMATS}
+    for seed, (name, options) in enumerate(DOC_SIZES.items()):
+        for fmt in DOC_FORMATS:
+            path = os.path.join(folder, f"generated_{name}.{fmt}")
+            if not os.path.exists(path):
+                WRITERS[fmt](path + ".part", *options, seed=seed)
+                os.replace(path + ".part", path)
+            paths[fmt].append(path)
+    return paths
@@ -0,0 +1,190 @@
+"""
+Deterministic HTML pages used by the benchmarks.
+
+The pages mimic a typical news site: a large inline <script>/<style> head,
+navigation, an article body, related-article teasers, comments, a cookie
+banner, inline SVG icons and plenty of images. Saved pages dropped into the
+fixtures folder are picked up alongside the generated ones; the committed
+saved_*.html pages are real documentation pages (see fixtures/SOURCES.md).
+
+Next to every generated page.html a page.txt holds its main article text,
+the reference the article extraction benchmark scores against. For the
+saved pages it is checked by hand rather than derived from the markup.
+"""
+import html
+import os
+import random
+import re
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# name -> (paragraphs, images, use <article>[, boilerplate inside the article])
+PAGE_SIZES = {
+    "small": (8, 6, True),
+    "medium": (60, 40, True),
+    "large": (400, 250, True),
+    "no_article": (60, 40, False),
+    "noisy_article": (60, 40, True, True),
+}
+
+# Small malformed pages the parser backends repair differently; the
+# parser benchmark checks them against html.parser's full parse.
+MALFORMED_PAGES = {
+    "unclosed_p_in_cells": "<table><tr><td><p>unclosed<td><p>second<td>cell</table>",
+    "p_closed_by_cell": "<table><tr><td><p>unclosed</td><td>second<p>cell</td></tr></table>",
+    "p_closed_by_div": "<div><p>one</div>two<p>three",
+    "article_closed_early": "<article><p>one<p>two<div>three</article>four<p>five",
+    "stray_end_tags": "</p></div><p>a</b>b</i></p><p>c",
+    "img_in_svg": "<p>text</p><svg><img src='a.png'></svg><img src='b.png'>",
+    "img_in_p_in_table": "<table><p><img src=a.png alt=x><tr><td><img src=b.png class='c d'></table>",
+    "picture_unclosed_source": '<picture><source srcset="a.webp 1x"><img src="a.jpg" alt></picture>',
+    "duplicate_attributes": "<p>x</p><img src=a.png src=b.png data-src=c.png width=10 width=20>",
+}
+
+WORDS = (
+    "the of and to in a is that for it as was with be by on not he this are or "
+    "his from at which but have an they you were her she there been one all "
+    "would their we him has when who more will no if out so said what up its "
+    "about into than them can only other new some time could these two may "
+    "first then do any like my now over such our man me even most made after "
+    "also did many before must through back years where much your way well"
+).split()
+
+def _sentence(rng, words=12):
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text.capitalize() + "."
+
+def _paragraph(rng):
+    parts = []
+    for _ in range(rng.randint(2, 6)):
+        sentence = _sentence(rng, rng.randint(6, 20))
+        if rng.random() < 0.15:
+            sentence = f'<a href="/story/{rng.randint(1, 9999)}">{sentence}</a>'
+        elif rng.random() < 0.1:
+            sentence = f"<em>{sentence}</em>"
+        parts.append(sentence)
+    return "<p>" + " ".join(parts) + "</p>"
+
+def _image(rng, i):
+    width = rng.choice([1, 120, 320, 640, 1280])
+    src = f"/media/img_{i}.{rng.choice(['jpg', 'png', 'gif', 'webp'])}"
+    if rng.random() < 0.2:
+        return (f'<img data-src="{src}" src="data:image/gif;base64,R0lGODlhAQABAAAAACw=" '
+                f'srcset="{src}?w=320 320w, {src}?w=1280 1280w" alt="lazy {i}">')
+    return f'<img src="{src}" width="{width}" height="{width}" alt="image {i}">'
+
+def _svg(rng):
+    paths = "".join(
+        f'<path d="M{rng.randint(0, 24)} {rng.randint(0, 24)} L{rng.randint(0, 24)} {rng.randint(0, 24)}"/>'
+        for _ in range(40)
+    )
+    return f'<svg viewBox="0 0 24 24" width="24" height="24">{paths}</svg>'
+
+def make_page(paragraphs, images, use_article=True, seed=0, noisy=False):
+    """
+    Build one synthetic news page and return it as a string.
+    """
+    return build_page(paragraphs, images, use_article, seed, noisy)[0]
+
+def _block_text(fragment):
+    # One line per block, inline markup dropped.
+    lines = re.split(r"</?(?:p|h1|div|article)\b[^>]*>", fragment)
+    lines = (re.sub(r"<[^>]+>", "", line) for line in lines)
+    return "\n".join(html.unescape(" ".join(line.split())) for line in lines if line.strip())
+
+def _inline_boilerplate(rng, i):
+    # Share bars, "read more" boxes and newsletter prompts that sites put
+    # inside the article markup itself.
+    kind = i % 3
+    if kind == 0:
+        links = "".join(f'<li><a href="/share/{n}">Share on {name}</a></li>'
+                        for n, name in enumerate(["Facebook", "Twitter", "LinkedIn", "Email"]))
+        return f'<div class="share-tools"><ul>{links}</ul></div>'
+    if kind == 1:
+        items = "".join(f'<li><a href="/story/{rng.randint(1, 9999)}">{_sentence(rng, 9)}</a></li>'
+                        for _ in range(4))
+        return f'<div class="related-inline"><h3>Read more</h3><ul>{items}</ul></div>'
+    return ('<div class="newsletter-signup"><p>Sign up for our daily newsletter to get the '
+            'top stories, analysis and exclusive offers in your inbox every morning.</p>'
+            '<form><input type="email"><button>Subscribe</button></form></div>')
+
+def build_page(paragraphs, images, use_article=True, seed=0, noisy=False):
+    """
+    Build one synthetic news page; return (html, main article text).
+    """
+    rng = random.Random(seed)
+    script = "var config = {" + ",".join(f'"k{i}": "<div>{i}</div>"' for i in range(paragraphs * 20)) + "};"
+    style = "".join(f".c{i} {{ margin: {i}px; color: #{i % 999:03d}; }}\n" for i in range(paragraphs * 5))
+    nav = "".join(f'<li><a href="/section/{i}">Section {i}</a>{_svg(rng)}</li>' for i in range(15))
+    body = []
+    image_index = 0
+    for i in range(paragraphs):
+        body.append(_paragraph(rng))
+        if image_index < images and i % 2 == 0:
+            body.append(_image(rng, image_index))
+            image_index += 1
+    teasers = "".join(
+        f'<div class="teaser"><a href="/story/{i}"><img src="/thumb/{i}.jpg"><p>{_sentence(rng, 8)}</p></a></div>'
+        for i in range(12)
+    )
+    image_index += 12
+    extra_images = "".join(_image(rng, image_index + i) for i in range(max(0, images - image_index)))
+    comments = "".join(
+        f'<div class="comment"><p class="byline">user{i}</p><p>{_sentence(rng, 10)}</p></div>'
+        for i in range(paragraphs // 4)
+    )
+    if noisy:
+        text_body = list(body)
+        for i in range(len(body) // 8):
+            body.insert((i + 1) * 8 + i, _inline_boilerplate(rng, i))
+    else:
+        text_body = body
+    main = "\n".join(body)
+    if use_article:
+        header = f'<h1>{_sentence(rng, 8)}</h1><p class="byline">By Jane Doe</p>'
+        main = f'<article>{header}{main}</article>'
+    else:
+        header = f'<h1>{_sentence(rng, 8)}</h1>'
+        main = f'<div class="story">{header}{main}</div>'
+    page = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{_sentence(rng, 6)}</title>
+<meta property="og:title" content="{_sentence(rng, 6)}">
+<meta name="author" content="Jane Doe">
+<meta property="article:published_time" content="2024-03-0{seed % 9 + 1}T10:00:00Z">
+<style>{style}</style>
+<script>{script}</script>
+</head>
+<body>
+<div class="cookie-banner"><p>We use cookies to improve your experience. <a href="/privacy">Learn more</a></p></div>
+<header><nav><ul>{nav}</ul></nav></header>
+<main>{main}</main>
+<aside><h2>Related</h2>{teasers}{extra_images}</aside>
+<section class="comments">{comments}</section>
+<noscript><img src="/pixel.gif" width="1" height="1"></noscript>
+<footer><p>Copyright 2024 Example News</p></footer>
+<script>{script}</script>
+</body>
+</html>
+"""
+    return page, _block_text(header + "\n".join(text_body))
+
+def ensure_fixtures(folder=FIXTURES_DIR):
+    """
+    Write the generated pages and their article text into folder (once)
+    and return the paths of every .html file there, smallest first.
+    """
+    os.makedirs(folder, exist_ok=True)
+    for seed, (name, options) in enumerate(PAGE_SIZES.items()):
+        path = os.path.join(folder, f"generated_{name}.html")
+        text_path = os.path.splitext(path)[0] + ".txt"
+        if not (os.path.exists(path) and os.path.exists(text_path)):
+            page, text = build_page(*options[:3], seed=seed, noisy=options[3:] == (True,))
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(page)
+            with open(text_path, "w", encoding="utf-8") as f:
+                f.write(text)
+    paths = [os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(".html")]
+    return sorted(paths, key=os.path.getsize)
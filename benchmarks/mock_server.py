@@ -0,0 +1,113 @@
+"""
+Local HTTP server standing in for the web in the benchmarks.
+
+    python benchmarks/mock_server.py [--port 8765] [--latency-ms 20] [--bandwidth-kbps 20480]
+
+Serves the .html files in benchmarks/fixtures under /pages/, and a
+deterministic noise PNG for any other path ending in an image extension
+(the generated pages link to /media/img_N.jpg, /thumb/N.jpg and the like),
+so pages and their images can be scraped without network access. Every
+response waits latency seconds before the first byte and is then sent at
+no more than bandwidth bytes per second, like a remote host would.
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from doc_fixtures import png_bytes
+from html_fixtures import FIXTURES_DIR
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+IMAGE_SIZE = 96
+SEND_CHUNK = 16 * 1024
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        server = self.server
+        if path.startswith("/pages/"):
+            name = os.path.basename(path)
+            body = server.pages.get(name)
+            content_type = "text/html; charset=utf-8"
+        elif path.lower().endswith(IMAGE_SUFFIXES):
+            body = server.image(path)
+            content_type = "image/png"
+        elif path == "/robots.txt":
+            body, content_type = b"User-agent: *\nAllow: /\n", "text/plain"
+        else:
+            body = None
+        if body is None:
+            self.send_error(404)
+            return
+        time.sleep(server.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        for start in range(0, len(body), SEND_CHUNK):
+            chunk = body[start:start + SEND_CHUNK]
+            self.wfile.write(chunk)
+            if server.bandwidth:
+                time.sleep(len(chunk) / server.bandwidth)
+
+class MockServer(ThreadingHTTPServer):
+    """
+    ThreadingHTTPServer with the pages loaded up front and the images
+    generated on first request.
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, latency=0.0, bandwidth=None, folder=FIXTURES_DIR):
+        super().__init__(address, MockHandler)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.pages = {}
+        for name in os.listdir(folder):
+            if name.endswith(".html"):
+                with open(os.path.join(folder, name), "rb") as f:
+                    self.pages[name] = f.read()
+        self._images = {}
+        self._lock = threading.Lock()
+
+    def image(self, path):
+        with self._lock:
+            if path not in self._images:
+                self._images[path] = png_bytes(random.Random(path), IMAGE_SIZE)
+            return self._images[path]
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+def start_server(latency=0.0, bandwidth=None, port=0):
+    """
+    Run a MockServer on a background thread; returns it (see .url).
+    """
+    server = MockServer(("127.0.0.1", port), latency, bandwidth)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--bandwidth-kbps", type=float, default=20480,
+                        help="KiB per second per response (0: unlimited)")
+    args = parser.parse_args()
+    server = MockServer(("127.0.0.1", args.port), args.latency_ms / 1000, args.bandwidth_kbps * 1024 or None)
+    print(f"serving {len(server.pages)} pages on {server.url}/pages/")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
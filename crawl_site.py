@@ -0,0 +1,51 @@
+"""
+Crawl a site from the command line, extracting article text and/or images
+from every page.
+
+    python crawl_site.py https://example.com/blog/ --max-pages 500
+    python crawl_site.py https://example.com/ --mode images -o site_images
+    python crawl_site.py https://example.com/ --scope https://example.com/docs/
+
+Results are printed as NDJSON, one line per page as soon as it finishes.
+If the crawl runs out of time (--max-seconds) the last line is a
+{"type": "partial", ...} record saying so.
+"""
+import argparse
+import json
+import sys
+
+from web1 import (
+    crawl, Budget, FolderSink, IMAGE_DEDUP, CRAWL_MODES, CRAWL_MAX_PAGES, CRAWL_MAX_DEPTH,
+    CRAWL_WORKERS, CRAWL_PER_HOST, BUDGET_SECONDS,
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl a site and scrape every page.")
+    parser.add_argument("url", help="start URL")
+    parser.add_argument("--mode", choices=CRAWL_MODES, default="article")
+    parser.add_argument("-o", "--output", default="crawled_images", help="folder for images")
+    parser.add_argument("--max-pages", type=int, default=CRAWL_MAX_PAGES)
+    parser.add_argument("--max-depth", type=int, default=CRAWL_MAX_DEPTH)
+    parser.add_argument("--scope", help="only follow links starting with this URL prefix")
+    parser.add_argument("--any-domain", action="store_true", help="follow links to other hosts")
+    parser.add_argument("--workers", type=int, default=CRAWL_WORKERS)
+    parser.add_argument("--per-host", type=int, default=CRAWL_PER_HOST)
+    parser.add_argument("--ignore-robots", action="store_true", help="don't honour robots.txt")
+    parser.add_argument("--max-seconds", type=float, default=BUDGET_SECONDS or 0,
+                        help="stop starting new pages after this long (0: no limit)")
+    args = parser.parse_args()
+
+    sink = FolderSink(args.output, dedup=IMAGE_DEDUP) if args.mode != "article" else None
+    failed = 0
+    for result in crawl(args.url, mode=args.mode, output_folder=sink, max_pages=args.max_pages,
+                        max_depth=args.max_depth, same_domain=not args.any_domain, scope=args.scope,
+                        max_workers=args.workers, per_host=args.per_host,
+                        respect_robots=not args.ignore_robots,
+                        budget=Budget(seconds=args.max_seconds or None)):
+        failed += "error" in result
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,23 @@
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 
+MAX_WORKERS = 8
+TIMEOUT = 15
+
+def download_image(session, img_url, image_path):
+    try:
+        img_response = session.get(img_url, timeout=TIMEOUT)
+        img_response.raise_for_status()
+    except Exception as e:
+        print(f"Could not download image {img_url}: {e}")
+        return
+    with open(image_path, "wb") as f:
+        f.write(img_response.content)
+    print(f"Saved {img_url} as {image_path}")
+
 def scrape_images(url, output_folder="images"):
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
@@ -11,9 +27,15 @@ def scrape_images(url, output_folder="images"):
                       "AppleWebKit/537.36 (KHTML, like Gecko) "
                       "Chrome/115.0.0.0 Safari/537.36"
     }
+    # One session for the page and all images so connections are reused.
+    session = requests.Session()
+    session.headers.update(headers)
+    adapter = HTTPAdapter(pool_maxsize=MAX_WORKERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
     
     try:
-        response = requests.get(url, headers=headers)
+        response = session.get(url, timeout=TIMEOUT)
         response.raise_for_status()
     except Exception as e:
         print(f"Error fetching the URL: {e}")
@@ -26,26 +48,25 @@ def scrape_images(url, output_folder="images"):
         print("No images found on the page.")
         return
 
+    jobs = []
     for i, img in enumerate(image_tags):
         img_url = img.get("src")
         if not img_url:
             continue
         img_url = requests.compat.urljoin(url, img_url)
-        
-        try:
-            img_response = requests.get(img_url, headers=headers)
-            img_response.raise_for_status()
-        except Exception as e:
-            print(f"Could not download image {img_url}: {e}")
-            continue
         ext = os.path.splitext(img_url)[1]
         if not ext or len(ext) > 5:
             ext = ".jpg"
-        image_path = os.path.join(output_folder, f"image_{i}{ext}")
+        jobs.append((img_url, os.path.join(output_folder, f"image_{i}{ext}")))
 
-        with open(image_path, "wb") as f:
-            f.write(img_response.content)
-        print(f"Saved {img_url} as {image_path}")
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = {pool.submit(download_image, session, img_url, image_path): img_url
+                   for img_url, image_path in jobs}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Could not save image {futures[future]}: {e}")
 
 if __name__ == "__main__":
     website_url = input("Enter the website URL: ").strip()
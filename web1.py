@@ -1,180 +1,2441 @@
 import os
 import re
+import base64
+import struct
+import math
+import time
+import uuid
+import hashlib
+import multiprocessing
+import sqlite3
 import zipfile
+import posixpath
+import shutil
+import queue
+import threading
+import logging
+from logging.handlers import RotatingFileHandler
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from collections import OrderedDict, deque
+from itertools import chain, islice
+from array import array
+from bisect import bisect_left, bisect_right
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode, unquote_to_bytes
+from urllib.robotparser import RobotFileParser
 import requests
+from requests.adapters import HTTPAdapter
 import fitz               # PyMuPDF
-from flask import Flask, request, render_template_string, redirect, url_for
-from bs4 import BeautifulSoup
+from flask import Flask, request, render_template, redirect, url_for, jsonify, Response, send_file
+from html.parser import HTMLParser
+from bs4 import BeautifulSoup, SoupStrainer, UnicodeDammit
 from youtube_transcript_api import YouTubeTranscriptApi
-import mammoth
 import tempfile
 import json
+from xml.etree import ElementTree
+
+try:
+    import lxml  # noqa: F401  (only used through BeautifulSoup)
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
 
 app = Flask(__name__)
 
 ################################################################################
-#  GLOBAL LOG STORAGE
+#  GLOBAL LOG STORAGE
+#  The most recent LOG_CAPACITY entries are kept in a ring buffer, so memory
+#  and page size stay flat however long the server runs. Set LOG_FILE to
+#  also append every entry to a rotating JSONL file.
+################################################################################
+LOG_CAPACITY = int(os.environ.get("LOG_CAPACITY", "1000"))
+# Number of entries rendered into the HTML page.
+LOG_RENDER_LIMIT = 100
+LOG_FILE = os.environ.get("LOG_FILE")
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+LOG_FILE_BACKUPS = 5
+
+class LogEntry:
+    """
+    One log line. seq increases by one for every entry ever added.
+    """
+    __slots__ = ("seq", "timestamp", "type", "message", "duration")
+
+    def __init__(self, seq, timestamp, entry_type, message, duration=None):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.type = entry_type
+        self.message = message
+        self.duration = duration
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class LogStore:
+    """
+    Thread-safe, fixed-capacity store of LogEntry objects with an optional
+    rotating JSONL file sink.
+    """
+    def __init__(self, capacity, path=None, max_bytes=LOG_FILE_MAX_BYTES, backups=LOG_FILE_BACKUPS):
+        self._entries = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._sink = None
+        if path:
+            self._sink = logging.getLogger(f"{__name__}.logstore")
+            self._sink.setLevel(logging.INFO)
+            self._sink.propagate = False
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._sink.addHandler(handler)
+
+    def add(self, entry_type, message, duration=None):
+        with self._lock:
+            self._seq += 1
+            entry = LogEntry(self._seq, time.time(), entry_type, message, duration)
+            self._entries.append(entry)
+        if self._sink is not None:
+            self._sink.info(json.dumps(entry.to_dict()))
+        return entry
+
+    def recent(self, limit):
+        """
+        The newest limit entries, oldest first.
+        """
+        with self._lock:
+            start = max(0, len(self._entries) - max(limit, 0))
+            return list(islice(self._entries, start, None))
+
+    def since(self, seq, limit):
+        """
+        Up to limit entries added after seq, oldest first.
+        """
+        with self._lock:
+            if not self._entries:
+                return []
+            start = max(0, seq - self._entries[0].seq + 1)
+            return list(islice(self._entries, start, start + max(limit, 0)))
+
+LOGS = LogStore(LOG_CAPACITY, LOG_FILE)
+
+def add_log(entry_type, message, duration=None):
+    """
+    Add a log entry with a type/category and message, and optionally how
+    many seconds the logged operation took.
+    """
+    LOGS.add(entry_type, message, duration)
+
+################################################################################
+#  HTTP SESSION / DOWNLOAD SETTINGS
+################################################################################
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/115.0.0.0 Safari/537.36"
+}
+
+# Total number of images downloaded at the same time by scrape_images.
+IMAGE_DOWNLOAD_WORKERS = 8
+# Maximum number of simultaneous downloads from any single host.
+IMAGE_DOWNLOAD_PER_HOST = 4
+# Seconds to wait (connect and read) for a single image.
+IMAGE_DOWNLOAD_TIMEOUT = 15
+# Seconds to wait (connect and read) for an article page.
+ARTICLE_TIMEOUT = 20
+# Images are streamed to disk in chunks of this many bytes.
+IMAGE_CHUNK_SIZE = 64 * 1024
+# Images larger than this are skipped (None disables the limit).
+IMAGE_MAX_BYTES = 25 * 1024 * 1024
+
+_HTTP_SESSION = None
+_HTTP_SESSION_LOCK = threading.Lock()
+
+def get_http_session():
+    """
+    The requests.Session all scrapers share. Keeping one session around lets connections stay alive and be reused
+    across images and across requests instead of handshaking every time.
+    """
+    global _HTTP_SESSION
+    with _HTTP_SESSION_LOCK:
+        if _HTTP_SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=IMAGE_DOWNLOAD_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            _HTTP_SESSION = session
+        return _HTTP_SESSION
+
+class HostLimiter:
+    """
+    Cap the number of concurrent requests made to each host.
+    """
+    def __init__(self, per_host):
+        self.per_host = per_host
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    @contextmanager
+    def slot(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host)
+                self._semaphores[host] = semaphore
+        with semaphore:
+            yield
+
+class DownloadTooLarge(ValueError):
+    """
+    Raised when a streamed download grows past its size limit.
+    """
+
+def write_chunks(chunks, out_path, max_bytes=None):
+    """
+    Write an iterable of byte chunks to out_path and return the number of
+    bytes written. Data goes to a temporary ".part" file that is renamed
+    into place only once complete, so a failed or oversized download never
+    leaves a truncated file behind.
+    """
+    part_path = out_path + ".part"
+    written = 0
+    try:
+        with open(part_path, "wb") as f_out:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                written += len(chunk)
+                if max_bytes is not None and written > max_bytes:
+                    raise DownloadTooLarge(f"{out_path} exceeds {max_bytes} bytes")
+                f_out.write(chunk)
+        os.replace(part_path, out_path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    return written
+
+def response_chunks(response, chunk_size=None, max_bytes=None):
+    """
+    Iterate over the body of a requests response opened with stream=True.
+    A Content-Length above max_bytes is rejected before any body is read.
+    """
+    content_length = response.headers.get("Content-Length")
+    if max_bytes is not None and content_length and content_length.isdigit():
+        if int(content_length) > max_bytes:
+            raise DownloadTooLarge(f"Content-Length {content_length} exceeds {max_bytes} bytes")
+    return response.iter_content(chunk_size=chunk_size or IMAGE_CHUNK_SIZE)
+
+################################################################################
+#  BUDGETS
+#  Every extractor runs under a Budget: a wall-clock deadline plus limits on
+#  bytes fetched over the network, images written, pages (PDF pages, slides,
+#  crawled pages) and bytes decompressed from archives and PDF streams.
+#  Hot loops charge it as they go; once any limit is hit the extractor
+#  stops and returns what it has so far, and budget.report() says which
+#  limit ended the work. The defaults below size an interactive request and
+#  apply when no budget is passed; background jobs and crawls get bigger
+#  ones (job_budget(), crawl_budget()). 0 in the environment disables a
+#  limit.
+################################################################################
+BUDGET_SECONDS = float(os.environ.get("BUDGET_SECONDS", "300")) or None
+BUDGET_MAX_BYTES = int(os.environ.get("BUDGET_MAX_BYTES", str(1024 * 1024 * 1024))) or None
+BUDGET_MAX_IMAGES = int(os.environ.get("BUDGET_MAX_IMAGES", "10000")) or None
+BUDGET_MAX_PAGES = int(os.environ.get("BUDGET_MAX_PAGES", "10000")) or None
+BUDGET_MAX_DECOMPRESSED = int(os.environ.get("BUDGET_MAX_DECOMPRESSED", str(2 * 1024 * 1024 * 1024))) or None
+
+class BudgetExceeded(Exception):
+    """
+    Raised inside an extractor when its Budget runs out. Extractors catch
+    it and return a partial result; it does not reach their callers.
+    """
+    def __init__(self, limit):
+        super().__init__(f"Budget exhausted: {limit}")
+        self.limit = limit
+
+class Budget:
+    """
+    Cooperative resource limits for one extraction (see the section
+    comment). Safe to share between the threads of one job. Past the
+    deadline, or after cancel(), every check fails, so concurrent workers
+    wind down quickly; a counted limit only refuses what would go over it,
+    letting work already admitted finish. stopped_by is the first limit
+    that was hit.
+    """
+    LIMITS = ("bytes", "images", "pages", "decompressed")
+
+    def __init__(self, seconds=BUDGET_SECONDS, max_bytes=BUDGET_MAX_BYTES, max_images=BUDGET_MAX_IMAGES,
+                 max_pages=BUDGET_MAX_PAGES, max_decompressed=BUDGET_MAX_DECOMPRESSED):
+        self.started = time.monotonic()
+        self.deadline = self.started + seconds if seconds else None
+        self.limits = {"bytes": max_bytes, "images": max_images, "pages": max_pages,
+                       "decompressed": max_decompressed}
+        self.used = dict.fromkeys(self.LIMITS, 0)
+        self.stopped_by = None
+        self._lock = threading.Lock()
+
+    def stop(self, limit):
+        """
+        Record limit as hit (unless another already was) and raise
+        BudgetExceeded.
+        """
+        with self._lock:
+            if self.stopped_by is None:
+                self.stopped_by = limit
+        raise BudgetExceeded(limit)
+
+    def cancel(self):
+        with self._lock:
+            self.stopped_by = "cancelled"
+
+    def check(self):
+        """
+        Raise BudgetExceeded if the work was cancelled or is out of time.
+        """
+        if self.stopped_by == "cancelled":
+            raise BudgetExceeded("cancelled")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.stop("seconds")
+
+    def spend(self, limit, amount=1):
+        """
+        Charge amount against one of LIMITS, raising BudgetExceeded
+        (without charging it) if that would take it over.
+        """
+        self.check()
+        with self._lock:
+            used = self.used[limit] + amount
+            over = self.limits[limit] is not None and used > self.limits[limit]
+            if not over:
+                self.used[limit] = used
+        if over:
+            self.stop(limit)
+
+    def remaining(self, limit):
+        """
+        How much of limit is left, or None if it is unlimited.
+        """
+        if self.limits[limit] is None:
+            return None
+        with self._lock:
+            return max(0, self.limits[limit] - self.used[limit])
+
+    def metered(self, chunks, limit="bytes"):
+        """
+        Pass byte chunks through, charging each one against limit.
+        """
+        for chunk in chunks:
+            self.spend(limit, len(chunk))
+            yield chunk
+
+    def timeout(self, default):
+        """
+        default, cut down to the time left before the deadline; use it
+        for every network call.
+        """
+        self.check()
+        if self.deadline is None:
+            return default
+        return max(0.1, min(default, self.deadline - time.monotonic()))
+
+    @property
+    def complete(self):
+        return self.stopped_by is None
+
+    def report(self):
+        """
+        {"complete", "stopped_by", "elapsed"} plus the amount used of each
+        limit, for status messages and API responses.
+        """
+        with self._lock:
+            used = dict(self.used)
+        return dict(used, complete=self.stopped_by is None, stopped_by=self.stopped_by,
+                    elapsed=round(time.monotonic() - self.started, 3))
+
+def budgeted(events, budget):
+    """
+    Run an event generator under budget. When the budget runs out the
+    stream ends with a {"type": "partial", ...budget.report()} event
+    instead of an exception.
+    """
+    try:
+        yield from events
+    except BudgetExceeded:
+        yield dict(budget.report(), type="partial")
+    finally:
+        events.close()
+
+################################################################################
+#  OUTPUT SINKS
+#  Extractors hand every image they produce to a sink as a stream of byte
+#  chunks. Passing a folder name instead of a sink means FolderSink.
+#
+#  IMAGE_DEDUP controls duplicate handling: "off", "exact" (skip files
+#  whose sha256 was already stored) or "perceptual" (also skip images whose
+#  difference hash is within PERCEPTUAL_MAX_DISTANCE bits of a stored one;
+#  needs Pillow).
+################################################################################
+IMAGE_DEDUP = os.environ.get("IMAGE_DEDUP", "exact")
+PERCEPTUAL_MAX_DISTANCE = 6
+
+def _hashing(chunks, digest):
+    for chunk in chunks:
+        digest.update(chunk)
+        yield chunk
+
+def image_fingerprint(path):
+    """
+    64-bit difference hash (dHash) of an image file, or None if Pillow is
+    missing or the file cannot be decoded as an image.
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as img:
+            pixels = list(img.convert("L").resize((9, 8)).getdata())
+    except Exception:
+        return None
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+class FolderSink:
+    """
+    Write images into a folder and keep a manifest entry for each one:
+    its name, where it came from, its path, size in bytes and sha256.
+    With dedup enabled, data is hashed while it streams to a staging file;
+    a duplicate is then discarded instead of stored, and its manifest entry
+    points at the file already stored ("duplicate_of").
+    """
+    def __init__(self, folder, dedup="off"):
+        if dedup not in ("off", "exact", "perceptual"):
+            raise ValueError(f"Unknown dedup mode: {dedup}")
+        if dedup == "perceptual" and Image is None:
+            raise ValueError("Perceptual dedup needs Pillow installed.")
+        self.folder = folder
+        self.dedup = dedup
+        self.manifest = []
+        self._lock = threading.Lock()
+        self._by_sha256 = {}
+        self._fingerprints = []
+        os.makedirs(folder, exist_ok=True)
+
+    @property
+    def stored_count(self):
+        return sum(1 for entry in self.manifest if not entry.get("duplicate_of"))
+
+    @property
+    def duplicate_count(self):
+        return len(self.manifest) - self.stored_count
+
+    def _stage(self, name, chunks, max_bytes):
+        """
+        Stream chunks to a staging file; return (staged_path, size, sha256).
+        Without dedup there is nothing to decide, so data goes straight to
+        its final name.
+        """
+        digest = hashlib.sha256()
+        path = os.path.join(self.folder, name)
+        staged = path if self.dedup == "off" else f"{path}.{uuid.uuid4().hex}.staged"
+        size = write_chunks(_hashing(chunks, digest), staged, max_bytes)
+        return staged, size, digest.hexdigest()
+
+    def _commit(self, staged, name, sha256):
+        """
+        Move a staged file into place and return its final path.
+        """
+        path = os.path.join(self.folder, name)
+        if staged != path:
+            os.replace(staged, path)
+        return path
+
+    @property
+    def staging_dir(self):
+        """
+        Folder for staging files that adopt() can later move into place.
+        """
+        return self.folder
+
+    def write(self, name, chunks, source=None, max_bytes=None):
+        staged, size, sha256 = self._stage(name, chunks, max_bytes)
+        return self.adopt(name, staged, size, sha256, source)
+
+    def adopt(self, name, staged, size, sha256, source=None):
+        """
+        Store a file that was already written under staging_dir, e.g. by a
+        worker process, given its size and sha256; otherwise as write().
+        """
+        fingerprint = image_fingerprint(staged) if self.dedup == "perceptual" else None
+        with self._lock:
+            original = self._by_sha256.get(sha256) if self.dedup != "off" else None
+            if original is None and fingerprint is not None:
+                original = self._near_duplicate(fingerprint)
+            if original is not None:
+                os.remove(staged)
+                entry = {
+                    "name": name, "source": source, "path": original["path"],
+                    "bytes": size, "sha256": sha256, "duplicate_of": original["name"],
+                }
+            else:
+                entry = {
+                    "name": name, "source": source, "path": self._commit(staged, name, sha256),
+                    "bytes": size, "sha256": sha256, "duplicate_of": None,
+                }
+                if self.dedup != "off":
+                    self._by_sha256[sha256] = entry
+                if fingerprint is not None:
+                    self._fingerprints.append((fingerprint, entry))
+            self._record(entry)
+        return entry
+
+    def repeat(self, name, original, source=None):
+        """
+        List name as another use of original, an entry already in the
+        manifest (the same URL or PDF image met again), storing nothing.
+        """
+        entry = _repeat_entry(name, original, source)
+        with self._lock:
+            self._record(entry)
+        return entry
+
+    def _near_duplicate(self, fingerprint):
+        # Caller holds the lock.
+        for other, entry in self._fingerprints:
+            if (fingerprint ^ other).bit_count() <= PERCEPTUAL_MAX_DISTANCE:
+                return entry
+        return None
+
+    def _record(self, entry):
+        # Caller holds the lock.
+        self.manifest.append(entry)
+
+def _repeat_entry(name, original, source):
+    return {
+        "name": name, "source": source, "path": original["path"], "bytes": original["bytes"],
+        "sha256": original["sha256"], "duplicate_of": original["duplicate_of"] or original["name"],
+    }
+
+def _record_repeats(sink, repeats, entries):
+    """
+    Add a manifest entry for each (name, source, first_source) in repeats
+    whose first use was stored; entries maps sources to their entries.
+    Each name gets the extension of the entry it repeats. Returns the names.
+    """
+    names = []
+    for name, source, first_source in repeats:
+        original = entries.get(first_source)
+        if original is not None:
+            ext = os.path.splitext(original["name"])[1]
+            names.append(sink.repeat(name + ext, original, source)["name"])
+    return names
+
+def as_sink(output):
+    """
+    Accept either a sink or a folder path and return a sink.
+    """
+    if isinstance(output, (str, os.PathLike)):
+        return FolderSink(output)
+    return output
+
+################################################################################
+#  IMAGE STORE
+#  Images produced by the web routes are kept in a content-addressed store:
+#  each distinct file is stored once under objects/<aa>/<bb>/<sha256><ext>,
+#  so concurrent jobs can never overwrite each other and no directory grows
+#  huge. A SQLite index records which images every job produced.
+################################################################################
+# Kept in the app's instance folder, not the current directory, so a run
+# never drops the store into whatever checkout it was started from.
+IMAGE_STORE_ROOT = os.environ.get("IMAGE_STORE_ROOT", os.path.join(app.instance_path, "image_store"))
+
+class ImageStore:
+    """
+    Content-addressed file store with a per-job manifest index.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS manifest ("
+                "job_id TEXT, name TEXT, source TEXT, sha256 TEXT, path TEXT, "
+                "bytes INTEGER, duplicate_of TEXT, created REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS manifest_job ON manifest (job_id)")
+
+    def blob_path(self, sha256, ext=""):
+        return os.path.join(self.root, "objects", sha256[:2], sha256[2:4], sha256 + ext)
+
+    def staging_path(self):
+        return os.path.join(self.tmp_dir, uuid.uuid4().hex)
+
+    def commit(self, staged, sha256, ext):
+        """
+        Atomically move a staged file to its content address. If the blob
+        already exists the staged copy is simply dropped.
+        """
+        path = self.blob_path(sha256, ext)
+        if os.path.exists(path):
+            os.remove(staged)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(staged, path)
+        return path
+
+    def find(self, sha256):
+        """
+        Path of a stored blob by hash, whatever its extension, or None.
+        """
+        folder = os.path.dirname(self.blob_path(sha256))
+        if os.path.isdir(folder):
+            for filename in os.listdir(folder):
+                if filename.startswith(sha256):
+                    return os.path.join(folder, filename)
+        return None
+
+    def add_entry(self, job_id, entry):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO manifest (job_id, name, source, sha256, path, bytes, duplicate_of, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, entry["name"], entry["source"], entry["sha256"], entry["path"],
+                 entry["bytes"], entry.get("duplicate_of"), time.time()),
+            )
+
+    def job_manifest(self, job_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, source, sha256, path, bytes, duplicate_of FROM manifest "
+                "WHERE job_id = ? ORDER BY rowid", (job_id,)
+            ).fetchall()
+        return [
+            dict(zip(("name", "source", "sha256", "path", "bytes", "duplicate_of"), row))
+            for row in rows
+        ]
+
+class StoreSink(FolderSink):
+    """
+    Sink that writes into an ImageStore under a job id. Identical content
+    always shares one blob; dedup additionally marks repeats within the job
+    as duplicate_of (and, in perceptual mode, near-duplicates).
+    """
+    def __init__(self, store, job_id, dedup="off"):
+        super().__init__(store.root, dedup)
+        self.store = store
+        self.job_id = job_id
+
+    @property
+    def staging_dir(self):
+        return self.store.tmp_dir
+
+    def _stage(self, name, chunks, max_bytes):
+        digest = hashlib.sha256()
+        staged = self.store.staging_path()
+        size = write_chunks(_hashing(chunks, digest), staged, max_bytes)
+        return staged, size, digest.hexdigest()
+
+    def _commit(self, staged, name, sha256):
+        ext = os.path.splitext(name)[1].lower()
+        return self.store.commit(staged, sha256, ext if len(ext) <= 6 else "")
+
+    def _record(self, entry):
+        super()._record(entry)
+        self.store.add_entry(self.job_id, entry)
+
+_IMAGE_STORE = None
+_IMAGE_STORE_LOCK = threading.Lock()
+
+def get_image_store():
+    """
+    The ImageStore under IMAGE_STORE_ROOT.
+    """
+    global _IMAGE_STORE
+    with _IMAGE_STORE_LOCK:
+        if _IMAGE_STORE is None:
+            _IMAGE_STORE = ImageStore(IMAGE_STORE_ROOT)
+        return _IMAGE_STORE
+
+################################################################################
+#  ZIP STREAMING
+#  Results can also be sent back as a ZIP archive that is built while the
+#  extractor runs. The extractor writes into a ZipFile in a worker thread;
+#  the ZipFile's underlying "file" is a bounded queue which the response
+#  generator drains, so the archive is never held in memory or on disk.
+################################################################################
+# Pending archive chunks; the extractor blocks when the client reads slower.
+ZIP_STREAM_QUEUE_SIZE = 64
+# Already-compressed formats are STORED; deflating them again costs CPU and
+# saves nothing. Everything else is DEFLATED.
+ZIP_STORED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+# Images up to this many bytes are held in memory and hashed before they go
+# into the archive; bigger ones are streamed in as they arrive.
+ZIP_BUFFER_MAX_BYTES = 1024 * 1024
+
+class ZipStreamClosed(BaseException):
+    """
+    Raised in the extractor thread once the client has gone away. Like
+    GeneratorExit it is not an Exception, so the extractors' broad error
+    handling lets it through and the work stops.
+    """
+
+class _QueueWriter:
+    """
+    Write-only, unseekable file object that hands every write to a bounded
+    queue. ZipFile falls back to data descriptors for such streams.
+    """
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize)
+        self.cancelled = threading.Event()
+
+    def _put(self, item):
+        while not self.cancelled.is_set():
+            try:
+                self.queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+        raise ZipStreamClosed()
+
+    def write(self, data):
+        if data:
+            self._put(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def finish(self):
+        try:
+            self._put(None)
+        except ZipStreamClosed:
+            pass
+
+class ZipStreamSink:
+    """
+    Sink that adds every image to a streaming ZipFile, with the same write()
+    and manifest interface as FolderSink. With dedup on, repeated content is
+    listed in the manifest but not added again (matching is by SHA-256
+    only). Nothing is written to disk.
+
+    An entry cannot be taken back once its bytes are on the wire. When a
+    single thread writes (concurrent=False) and there is nothing to check
+    first, i.e. no dedup and no max_bytes, each image is streamed straight
+    into the archive. Otherwise up to ZIP_BUFFER_MAX_BYTES of it is read
+    first: an image that fits is hashed and checked against max_bytes and
+    earlier images before it is added, and concurrent downloads don't wait
+    on one another for it. A bigger one is streamed in as it arrives, with
+    the archive locked: it is deduplicated against later images but always
+    added itself, and if it fails part-way (say, it outgrows max_bytes)
+    its member is cut short and listed with an "error".
+    """
+    def __init__(self, zf, dedup="off", concurrent=False):
+        self.zf = zf
+        self.dedup = dedup
+        self.concurrent = concurrent
+        self.manifest = []
+        self._lock = threading.Lock()
+        self._by_sha256 = {}
+        self._names = set()
+
+    @property
+    def stored_count(self):
+        return sum(1 for entry in self.manifest if not entry.get("duplicate_of"))
+
+    @property
+    def duplicate_count(self):
+        return len(self.manifest) - self.stored_count
+
+    def repeat(self, name, original, source=None):
+        """
+        As FolderSink.repeat: list name as another use of original.
+        """
+        entry = _repeat_entry(name, original, source)
+        with self._lock:
+            self.manifest.append(entry)
+        return entry
+
+    def _member_name(self, name):
+        # Caller holds the lock.
+        stem, ext = os.path.splitext(name)
+        candidate, n = name, 1
+        while candidate in self._names:
+            candidate = f"{stem}_{n}{ext}"
+            n += 1
+        self._names.add(candidate)
+        return candidate
+
+    # adopt() callers stage files in a temporary folder of their own.
+    staging_dir = None
+
+    def write(self, name, chunks, source=None, max_bytes=None):
+        if not self.concurrent and self.dedup == "off" and max_bytes is None:
+            return self._add(name, chunks, None, None, source)
+        chunks = iter(chunks)
+        head = []
+        size = 0
+        for chunk in chunks:
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                raise DownloadTooLarge(f"more than {max_bytes} bytes")
+            head.append(chunk)
+            if size > ZIP_BUFFER_MAX_BYTES:
+                return self._add(name, chain(head, _limited(chunks, size, max_bytes)), None, None, source)
+        data = b"".join(head)
+        return self._add(name, [data], size, hashlib.sha256(data).hexdigest(), source)
+
+    def adopt(self, name, staged, size, sha256, source=None):
+        """
+        Add a file already written to staged, given its size and sha256,
+        and remove it.
+        """
+        try:
+            with open(staged, "rb") as f:
+                return self._add(name, iter(lambda: f.read(ZIP_CHUNK_SIZE), b""), size, sha256, source)
+        finally:
+            os.remove(staged)
+
+    def _add(self, name, parts, size, sha256, source):
+        """
+        Add parts as a member; with sha256 None the hash and size are
+        worked out while the parts are written, and the member is added
+        even if it turns out to be a duplicate.
+        """
+        with self._lock:
+            original = self._by_sha256.get(sha256) if self.dedup != "off" else None
+            if original is not None:
+                entry = {
+                    "name": name, "source": source, "path": original["path"],
+                    "bytes": size, "sha256": sha256, "duplicate_of": original["name"],
+                }
+            else:
+                member = self._member_name(name)
+                zinfo = zipfile.ZipInfo(member, time.localtime()[:6])
+                if os.path.splitext(member)[1].lower() in ZIP_STORED_EXTENSIONS:
+                    zinfo.compress_type = zipfile.ZIP_STORED
+                else:
+                    zinfo.compress_type = zipfile.ZIP_DEFLATED
+                digest = hashlib.sha256() if sha256 is None else None
+                written = 0
+                with self.zf.open(zinfo, "w") as dst:
+                    try:
+                        for part in parts:
+                            dst.write(part)
+                            written += len(part)
+                            if digest is not None:
+                                digest.update(part)
+                    except Exception as e:
+                        self.manifest.append({
+                            "name": name, "source": source, "path": member, "bytes": written,
+                            "sha256": None, "duplicate_of": None, "error": f"Cut short: {e}",
+                        })
+                        raise
+                if digest is not None:
+                    sha256, size = digest.hexdigest(), written
+                entry = {
+                    "name": name, "source": source, "path": member,
+                    "bytes": size, "sha256": sha256, "duplicate_of": None,
+                }
+                self._by_sha256.setdefault(sha256, entry)
+            self.manifest.append(entry)
+        return entry
+
+def _limited(chunks, size, max_bytes):
+    """
+    Pass the rest of chunks through, raising DownloadTooLarge once size
+    (what came before them) plus theirs goes over max_bytes.
+    """
+    for chunk in chunks:
+        size += len(chunk)
+        if max_bytes is not None and size > max_bytes:
+            raise DownloadTooLarge(f"more than {max_bytes} bytes")
+        yield chunk
+
+def stream_zip(produce, dedup="off", concurrent=False):
+    """
+    Run produce(sink) in a worker thread and yield the ZIP archive it
+    builds, chunk by chunk, as soon as the bytes exist. Pass concurrent=True
+    if produce writes to the sink from several threads. The archive ends
+    with a manifest.json describing every image (and the error, if
+    produce failed part-way; the images written until then are kept).
+    Closing the generator, e.g. on client disconnect, makes the worker's
+    next write raise ZipStreamClosed so the extraction stops early.
+    """
+    writer = _QueueWriter(ZIP_STREAM_QUEUE_SIZE)
+
+    def run():
+        try:
+            with zipfile.ZipFile(writer, "w") as zf:
+                sink = ZipStreamSink(zf, dedup, concurrent)
+                error = None
+                try:
+                    produce(sink)
+                except ZipStreamClosed:
+                    raise
+                except Exception as e:
+                    error = str(e)
+                    add_log("error", f"Error while streaming ZIP: {e}")
+                manifest = {"items": sink.manifest, "stored": sink.stored_count, "error": error}
+                zf.writestr("manifest.json", json.dumps(manifest, indent=2), zipfile.ZIP_DEFLATED)
+        except ZipStreamClosed:
+            add_log("info", "ZIP download cancelled by the client.")
+        finally:
+            writer.finish()
+
+    threading.Thread(target=run, daemon=True).start()
+    try:
+        while True:
+            data = writer.queue.get()
+            if data is None:
+                return
+            # Coalesce the many small header writes into fewer chunks.
+            parts, size = [data], len(data)
+            while size < ZIP_CHUNK_SIZE:
+                try:
+                    data = writer.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if data is None:
+                    yield b"".join(parts)
+                    return
+                parts.append(data)
+                size += len(data)
+            yield b"".join(parts)
+    finally:
+        writer.cancelled.set()
+
+################################################################################
+#  CACHING
+################################################################################
+# Seconds a cached article is served without contacting the origin. Older
+# entries are revalidated with If-None-Match / If-Modified-Since.
+ARTICLE_CACHE_TTL = int(os.environ.get("ARTICLE_CACHE_TTL", "300"))
+ARTICLE_CACHE_MAX_ENTRIES = 256
+# Optional SQLite file backing the in-memory cache.
+ARTICLE_CACHE_DB = os.environ.get("ARTICLE_CACHE_DB")
+ARTICLE_CACHE_MAX_DISK_ENTRIES = 10000
+
+# Batch scraping: total URLs in flight, and how many of them may target the
+# same host at once.
+ARTICLE_BATCH_WORKERS = 16
+ARTICLE_BATCH_PER_HOST = 2
+ARTICLE_BATCH_MAX_URLS = 5000
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries are considered fresh for ttl
+    seconds. With db_path set, entries are
+    also written to a SQLite table which serves as a larger second tier that
+    survives restarts.
+
+    Stale entries are not dropped on read so callers can revalidate them;
+    they leave the cache through normal LRU eviction. dumps/loads convert
+    values to and from the text stored in SQLite (JSON by default).
+    """
+    def __init__(self, ttl, max_entries, db_path=None, max_disk_entries=None, table="cache",
+                 dumps=json.dumps, loads=json.loads):
+        self.ttl = ttl
+        self.dumps = dumps
+        self.loads = loads
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.table = table
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ("
+                    "key TEXT PRIMARY KEY, value TEXT, stored REAL, accessed REAL)"
+                )
+
+    def _load(self, key):
+        # Caller holds the lock.
+        item = self._entries.get(key)
+        if item is not None:
+            self._entries.move_to_end(key)
+            return item
+        if self._conn is None:
+            return None
+        row = self._conn.execute(
+            f"SELECT value, stored FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        with self._conn:
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+        item = (self.loads(row[0]), row[1])
+        self._remember(key, item)
+        return item
+
+    def _remember(self, key, item):
+        # Caller holds the lock.
+        self._entries[key] = item
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        Return the cached value if it is still fresh, else None.
+        """
+        with self._lock:
+            item = self._load(key)
+        if item is None or time.time() - item[1] > self.ttl:
+            return None
+        return item[0]
+
+    def get_stale(self, key):
+        """
+        Return the cached value regardless of age, or None.
+        """
+        with self._lock:
+            item = self._load(key)
+        return item[0] if item is not None else None
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, (value, now))
+            if self._conn is None:
+                return
+            with self._conn:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, stored, accessed) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, self.dumps(value), now, now),
+                )
+                if self.max_disk_entries:
+                    self._conn.execute(
+                        f"DELETE FROM {self.table} WHERE key IN ("
+                        f"SELECT key FROM {self.table} ORDER BY accessed DESC "
+                        "LIMIT -1 OFFSET ?)",
+                        (self.max_disk_entries,),
+                    )
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+def normalize_url(url):
+    """
+    Canonical form of a URL for use as a cache key: lower-case scheme and
+    host, no default port or fragment, utm_* tracking parameters removed
+    and the remaining query parameters sorted.
+    """
+    parts = urlparse(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_")
+    )
+    return urlunparse((scheme, host, parts.path or "/", parts.params, urlencode(query), ""))
+
+def cache_key(url):
+    return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+_ARTICLE_CACHE = None
+_ARTICLE_CACHE_LOCK = threading.Lock()
+
+def get_article_cache():
+    """
+    The scrape_article cache, configured by the ARTICLE_CACHE_* settings.
+    """
+    global _ARTICLE_CACHE
+    with _ARTICLE_CACHE_LOCK:
+        if _ARTICLE_CACHE is None:
+            _ARTICLE_CACHE = TTLCache(
+                ARTICLE_CACHE_TTL,
+                ARTICLE_CACHE_MAX_ENTRIES,
+                db_path=ARTICLE_CACHE_DB,
+                max_disk_entries=ARTICLE_CACHE_MAX_DISK_ENTRIES,
+                table="articles",
+            )
+        return _ARTICLE_CACHE
+
+################################################################################
+#  TRANSCRIPT SOURCES
+#  Transcripts come from a pluggable fetcher: anything with a
+#  fetch(video_id, languages, timeout) method returning segment dicts. Set
+#  TRANSCRIPT_STUB_DIR to serve <video_id>.json files instead of calling
+#  YouTube, e.g. for offline testing.
+################################################################################
+TRANSCRIPT_LANGUAGES = ("en",)
+TRANSCRIPT_CACHE_TTL = int(os.environ.get("TRANSCRIPT_CACHE_TTL", str(7 * 24 * 60 * 60)))
+TRANSCRIPT_CACHE_MAX_ENTRIES = 512
+TRANSCRIPT_CACHE_DB = os.environ.get("TRANSCRIPT_CACHE_DB")
+TRANSCRIPT_CACHE_MAX_DISK_ENTRIES = 20000
+TRANSCRIPT_BATCH_WORKERS = 8
+TRANSCRIPT_BATCH_MAX_URLS = 500
+# Seconds a single transcript fetch may take.
+TRANSCRIPT_TIMEOUT = 30
+
+class _DeadlineSession(requests.Session):
+    """
+    A Session for clients that never pass a timeout: every request gets
+    the time left until a deadline, seconds from now, as its connect and
+    read timeout.
+    """
+    def __init__(self, seconds):
+        super().__init__()
+        self.deadline = time.monotonic() + seconds
+
+    def request(self, method, url, **kwargs):
+        left = self.deadline - time.monotonic()
+        if left <= 0:
+            raise requests.Timeout(f"Out of time before {method} {url}")
+        kwargs.setdefault("timeout", left)
+        return super().request(method, url, **kwargs)
+
+class YouTubeTranscriptFetcher:
+    """
+    Fetch transcripts from YouTube with youtube_transcript_api (1.x).
+    The library sets no timeouts and changes the session it is given, so
+    every fetch gets its own _DeadlineSession; they share one connection
+    pool.
+    """
+    def __init__(self):
+        self._adapter = HTTPAdapter(pool_maxsize=TRANSCRIPT_BATCH_WORKERS)
+
+    def fetch(self, video_id, languages, timeout=TRANSCRIPT_TIMEOUT):
+        session = _DeadlineSession(timeout)
+        session.mount("http://", self._adapter)
+        session.mount("https://", self._adapter)
+        api = YouTubeTranscriptApi(http_client=session)
+        return api.fetch(video_id, languages=list(languages)).to_raw_data()
+
+class StubTranscriptFetcher:
+    """
+    Serve transcripts from a dict of video_id -> segments and/or a folder of
+    <video_id>.json files, without any network access.
+    """
+    def __init__(self, transcripts=None, folder=None):
+        self.transcripts = dict(transcripts or {})
+        self.folder = folder
+
+    def fetch(self, video_id, languages, timeout=None):
+        if video_id in self.transcripts:
+            return self.transcripts[video_id]
+        if self.folder:
+            path = os.path.join(self.folder, f"{video_id}.json")
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    return json.load(f)
+        raise LookupError(f"No stub transcript for {video_id}.")
+
+if os.environ.get("TRANSCRIPT_STUB_DIR"):
+    TRANSCRIPT_FETCHER = StubTranscriptFetcher(folder=os.environ["TRANSCRIPT_STUB_DIR"])
+else:
+    TRANSCRIPT_FETCHER = YouTubeTranscriptFetcher()
+
+class Transcript:
+    """
+    A timed transcript stored as parallel arrays instead of a list of dicts:
+    segment starts and durations in array('d'), and all segment texts in a
+    single newline-joined string with each segment's start offset in
+    array('I'). Segments are kept sorted by start time, so time-range
+    lookups are a binary search.
+    """
+    __slots__ = ("starts", "durations", "offsets", "buffer")
+
+    def __init__(self, starts, durations, offsets, buffer):
+        self.starts = starts
+        self.durations = durations
+        # offsets has one extra entry so segment i is
+        # buffer[offsets[i]:offsets[i + 1] - 1].
+        self.offsets = offsets
+        self.buffer = buffer
+
+    @classmethod
+    def from_segments(cls, segments):
+        segments = sorted(segments, key=lambda seg: seg.get("start", 0.0))
+        starts = array("d", (float(seg.get("start", 0.0)) for seg in segments))
+        durations = array("d", (float(seg.get("duration", 0.0)) for seg in segments))
+        texts = [seg.get("text", "") for seg in segments]
+        offsets = array("I", [0])
+        for text in texts:
+            offsets.append(offsets[-1] + len(text) + 1)
+        return cls(starts, durations, offsets, "\n".join(texts))
+
+    def to_columns(self):
+        """
+        JSON-friendly form of the arrays, used for the on-disk cache.
+        """
+        return {
+            "starts": self.starts.tolist(),
+            "durations": self.durations.tolist(),
+            "offsets": self.offsets.tolist(),
+            "text": self.buffer,
+        }
+
+    @classmethod
+    def from_columns(cls, columns):
+        return cls(
+            array("d", columns["starts"]),
+            array("d", columns["durations"]),
+            array("I", columns["offsets"]),
+            columns["text"],
+        )
+
+    def __len__(self):
+        return len(self.starts)
+
+    def segment_text(self, i):
+        return self.buffer[self.offsets[i]:self.offsets[i + 1] - 1]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("segment index out of range")
+        return {"text": self.segment_text(i), "start": self.starts[i], "duration": self.durations[i]}
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    @property
+    def text(self):
+        """
+        Segment texts joined by newlines.
+        """
+        return self.buffer
+
+    def between(self, start=None, end=None):
+        """
+        Return the segments overlapping the time range [start, end) as a new
+        Transcript.
+        """
+        lo, hi = 0, len(self)
+        if start is not None:
+            lo = bisect_right(self.starts, start)
+            if lo > 0 and self.starts[lo - 1] + self.durations[lo - 1] > start:
+                lo -= 1
+        if end is not None:
+            hi = bisect_left(self.starts, end)
+        if hi <= lo:
+            return Transcript(array("d"), array("d"), array("I", [0]), "")
+        base = self.offsets[lo]
+        return Transcript(
+            self.starts[lo:hi],
+            self.durations[lo:hi],
+            array("I", (offset - base for offset in self.offsets[lo:hi + 1])),
+            self.buffer[base:self.offsets[hi] - 1],
+        )
+
+    def to_dicts(self):
+        return list(self)
+
+    def to_json(self):
+        return json.dumps(self.to_dicts())
+
+    @staticmethod
+    def _timestamp(seconds, separator):
+        millis = int(round(seconds * 1000))
+        hours, millis = divmod(millis, 3600000)
+        minutes, millis = divmod(millis, 60000)
+        secs, millis = divmod(millis, 1000)
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+    def to_srt(self):
+        blocks = []
+        for i in range(len(self)):
+            start, end = self.starts[i], self.starts[i] + self.durations[i]
+            blocks.append(
+                f"{i + 1}\n{self._timestamp(start, ',')} --> {self._timestamp(end, ',')}\n"
+                f"{self.segment_text(i)}\n"
+            )
+        return "\n".join(blocks)
+
+    def to_vtt(self):
+        blocks = ["WEBVTT\n"]
+        for i in range(len(self)):
+            start, end = self.starts[i], self.starts[i] + self.durations[i]
+            blocks.append(
+                f"{self._timestamp(start, '.')} --> {self._timestamp(end, '.')}\n{self.segment_text(i)}\n"
+            )
+        return "\n".join(blocks)
+
+_TRANSCRIPT_CACHE = None
+_TRANSCRIPT_CACHE_LOCK = threading.Lock()
+
+def get_transcript_cache():
+    """
+    The transcript cache, keyed by video id and language list.
+    """
+    global _TRANSCRIPT_CACHE
+    with _TRANSCRIPT_CACHE_LOCK:
+        if _TRANSCRIPT_CACHE is None:
+            _TRANSCRIPT_CACHE = TTLCache(
+                TRANSCRIPT_CACHE_TTL,
+                TRANSCRIPT_CACHE_MAX_ENTRIES,
+                db_path=TRANSCRIPT_CACHE_DB,
+                max_disk_entries=TRANSCRIPT_CACHE_MAX_DISK_ENTRIES,
+                table="transcripts",
+                dumps=lambda transcript: json.dumps(transcript.to_columns()),
+                loads=lambda text: Transcript.from_columns(json.loads(text)),
+            )
+        return _TRANSCRIPT_CACHE
+
+################################################################################
+#  HTML PARSING
+#  The article and image scrapers share a pluggable parser backend chosen
+#  with HTML_PARSER: "html.parser" (also what "auto", the default, picks),
+#  "selectolax" or "lxml". The faster two are opt-in: they match
+#  html.parser on well-formed pages, but repair malformed HTML their own
+#  way (an unclosed <p> in a table cell, an <article> closed before its
+#  <div>, an <img> inside <svg>, repeated attributes, where they keep the
+#  first value and html.parser the last), so switching changes the output
+#  on such pages. benchmarks/bench_parsers.py lists where they differ from
+#  html.parser.
+#
+#  PARSE_MODE "targeted" (default) only materializes what each extractor
+#  needs: <article>/<p> subtrees for articles and bare <img> attributes for
+#  images, skipping script, style and noscript content. "full" builds the
+#  whole document tree as before; on malformed pages it is the one that
+#  closes an unclosed <p> at its parent's end tag, as the original code did.
+################################################################################
+HTML_PARSER = os.environ.get("HTML_PARSER", "auto")
+PARSE_MODE = os.environ.get("PARSE_MODE", "targeted")
+
+# Elements whose content targeted parsing never looks at.
+SKIPPED_TAGS = ("script", "style", "noscript", "template", "svg")
+
+def available_parsers():
+    """
+    Installed parser backends, fastest first.
+    """
+    parsers = []
+    if LexborHTMLParser is not None:
+        parsers.append("selectolax")
+    if lxml is not None:
+        parsers.append("lxml")
+    parsers.append("html.parser")
+    return parsers
+
+def resolve_parser(parser=None):
+    """
+    Turn a parser setting (or HTML_PARSER) into an installed backend name.
+    "auto" is html.parser, so installing lxml or selectolax doesn't change
+    the output.
+    """
+    parser = parser or HTML_PARSER
+    installed = available_parsers()
+    if parser == "auto":
+        return "html.parser"
+    if parser not in installed:
+        raise ValueError(f"HTML parser '{parser}' is not installed.")
+    return parser
+
+def _decode_html(content):
+    # Decode bytes the same way BeautifulSoup does so every backend sees
+    # the same text.
+    if isinstance(content, bytes):
+        return UnicodeDammit(content, is_html=True).unicode_markup
+    return content
+
+def _selectolax_tree(content, targeted=False):
+    # Drop the nodes whose text get_text() ignores; targeted mode also drops
+    # everything else in SKIPPED_TAGS.
+    tree = LexborHTMLParser(_decode_html(content))
+    tree.strip_tags(list(SKIPPED_TAGS) if targeted else ["script", "style"])
+    return tree
+
+def _selectolax_text(node, separator=""):
+    # Equivalent of BeautifulSoup's get_text(separator, strip=True): strip
+    # each text node and drop the ones that end up empty.
+    parts = (n.text_content.strip() for n in node.traverse(include_text=True) if n.tag == "-text")
+    return separator.join(part for part in parts if part)
+
+def _picture_srcset(sources):
+    # srcset values of a <picture>'s <source> children, as one srcset.
+    return ", ".join(srcset for srcset in sources if srcset)
+
+class _ImageTagCollector(HTMLParser):
+    """
+    Streaming tokenizer that records the attributes of <img> tags without
+    building a tree, ignoring anything inside SKIPPED_TAGS.
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.images = []
+        self._skip_depth = 0
+        self._picture_sources = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif self._skip_depth:
+            return
+        elif tag == "picture":
+            self._picture_sources = []
+        elif tag == "source" and self._picture_sources is not None:
+            self._picture_sources.append(dict(attrs).get("srcset") or "")
+        elif tag == "img":
+            image = {name: value or "" for name, value in attrs}
+            if self._picture_sources:
+                image["picture_srcset"] = _picture_srcset(self._picture_sources)
+            self.images.append(image)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag not in SKIPPED_TAGS:
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == "picture" and not self._skip_depth:
+            self._picture_sources = None
+
+def extract_article_text(content, parser=None, mode=None, engine=None):
+    """
+    Pull the article text out of an HTML document. The "heuristic" engine
+    prefers the <article> tag, else the <p> tags; "density" (see
+    extract_article) ignores mode.
+    """
+    if (engine or ARTICLE_ENGINE) == "density":
+        return extract_article(content, engine="density", parser=parser)["text"]
+    parser = resolve_parser(parser)
+    targeted = (mode or PARSE_MODE) == "targeted"
+    if parser == "selectolax":
+        tree = _selectolax_tree(content, targeted)
+        article_tag = tree.css_first("article")
+        if article_tag is not None:
+            return _selectolax_text(article_tag, separator='\n')
+        return "\n".join(_selectolax_text(p) for p in tree.css("p"))
+
+    if targeted:
+        soup = BeautifulSoup(content, parser, parse_only=SoupStrainer(["article", "p"]))
+        for tag in soup.find_all(SKIPPED_TAGS):
+            tag.decompose()
+    else:
+        soup = BeautifulSoup(content, parser)
+    article_tag = soup.find('article')
+    if article_tag:
+        return article_tag.get_text(separator='\n', strip=True)
+    else:
+        paragraphs = soup.find_all('p')
+        return "\n".join(p.get_text(strip=True) for p in paragraphs)
+
+def parse_image_tags(content, parser=None, mode=None):
+    """
+    Return the attributes of every <img> tag in document order. An <img>
+    inside a <picture> also gets "picture_srcset", the srcsets of the
+    picture's <source> elements joined into one.
+    """
+    parser = resolve_parser(parser)
+    targeted = (mode or PARSE_MODE) == "targeted"
+    if parser == "selectolax":
+        tree = _selectolax_tree(content, targeted)
+        images = []
+        for node in tree.css("img"):
+            image = {name: value or "" for name, value in node.attributes.items()}
+            if node.parent is not None and node.parent.tag == "picture":
+                sources = [source.attributes.get("srcset") for source in node.parent.css("source")]
+                if sources:
+                    image["picture_srcset"] = _picture_srcset(sources)
+            images.append(image)
+        return images
+    if targeted:
+        collector = _ImageTagCollector()
+        collector.feed(_decode_html(content))
+        collector.close()
+        return collector.images
+    soup = BeautifulSoup(content, parser)
+    images = []
+    for img in soup.find_all("img"):
+        image = {name: " ".join(value) if isinstance(value, list) else value
+                 for name, value in img.attrs.items()}
+        # lxml doesn't know <source> is void and nests the <img> inside it.
+        picture = img.find_parent("picture")
+        if picture is not None:
+            sources = [source.get("srcset") for source in picture.find_all("source")]
+            if sources:
+                image["picture_srcset"] = _picture_srcset(sources)
+        images.append(image)
+    return images
+
+def parse_links(content, parser=None):
+    """
+    Return the href of every <a> tag in document order.
+    """
+    parser = resolve_parser(parser)
+    if parser == "selectolax":
+        tree = LexborHTMLParser(_decode_html(content))
+        return [node.attributes.get("href") or "" for node in tree.css("a[href]")]
+    soup = BeautifulSoup(content, parser, parse_only=SoupStrainer("a", href=True))
+    return [a.get("href") or "" for a in soup.find_all("a", href=True)]
+
+################################################################################
+#  ARTICLE EXTRACTION
+#  The "density" engine finds the main body of a page in one pass. A
+#  streaming tokenizer builds a light tree of block elements, recording
+#  per block how much text it holds and how much of that is link text.
+#  Every paragraph-like block with enough text scores for its parent (and
+#  half for its grandparent), weighted by its commas, length and link
+#  density. The best-scoring container, adjusted for tag and class/id
+#  hints ("comment", "cookie", "related", ... vs "article", "content",
+#  ...), is the article; its text is rendered without link-heavy or
+#  boilerplate sub-blocks. Title, byline and publish date come from meta
+#  tags, JSON-LD or the markup. Every step is linear in the page size.
+#
+#  ARTICLE_ENGINE "heuristic" keeps the previous behaviour: the first
+#  <article>, else every <p>.
+################################################################################
+ARTICLE_ENGINE = os.environ.get("ARTICLE_ENGINE", "density")
+ARTICLE_ENGINES = ("density", "heuristic")
+
+# Blocks with less text than this don't score.
+ARTICLE_MIN_UNIT_CHARS = 25
+# A winner with less text than this is a stray notice, not an article.
+ARTICLE_MIN_TEXT_CHARS = 140
+# Sub-blocks of the article this link-heavy are dropped from its text.
+ARTICLE_MAX_LINK_DENSITY = 0.5
+
+# Tags that score for their container.
+ARTICLE_UNIT_TAGS = {"p", "pre", "blockquote", "td", "dd"}
+# Inline tags don't become blocks; their text belongs to the enclosing one.
+ARTICLE_INLINE_TAGS = {
+    "a", "abbr", "b", "bdi", "bdo", "cite", "code", "data", "dfn", "em", "font", "i",
+    "kbd", "label", "mark", "q", "s", "samp", "small", "span", "strong", "sub", "sup",
+    "time", "u", "var",
+}
+ARTICLE_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+    "param", "source", "track", "wbr",
+}
+# Starting one of these closes an open <p>.
+ARTICLE_P_CLOSERS = {
+    "address", "article", "aside", "blockquote", "div", "dl", "fieldset", "figure",
+    "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "main",
+    "nav", "ol", "p", "pre", "section", "table", "ul",
+}
+# Never part of the article text.
+ARTICLE_DROP_TAGS = {"nav", "aside", "footer", "form", "button", "select", "dialog"}
+ARTICLE_TAG_WEIGHTS = {
+    "article": 10, "main": 5, "div": 5, "pre": 3, "td": 3, "blockquote": 3,
+    "address": -3, "ol": -3, "ul": -3, "dl": -3, "dd": -3, "dt": -3, "li": -3, "form": -3,
+    "h1": -5, "h2": -5, "h3": -5, "h4": -5, "h5": -5, "h6": -5, "th": -5,
+}
+ARTICLE_POSITIVE_CLASSES = re.compile(
+    r"article|body|content|entry|main|page|post|story|text|blog", re.I)
+# Matched against whole class/id tokens, split on whitespace, "-" and "_",
+# so "ad-slot" counts but "lead-paragraph" or "unavailable" do not.
+ARTICLE_NEGATIVE_CLASSES = re.compile(
+    r"(?:^|[\s_-])(?:ads?|adverts?|advertisement|banner|breadcrumbs?|comments?|community|consent|"
+    r"cookies?|disqus|foot|footer|header|hidden|menu|modal|nav|navbar|navigation|newsletter|"
+    r"outbrain|pagination|popup|promos?|related|share|sharing|sidebar|social|sponsor|sponsored|"
+    r"subscribe|tags|teaser|toolbar|tools|widgets?)(?=[\s_-]|$)", re.I)
+ARTICLE_BYLINE_CLASSES = re.compile(r"byline|author", re.I)
+
+# Meta tags consulted for each field, best first.
+ARTICLE_TITLE_META = ("og:title", "twitter:title", "headline")
+ARTICLE_BYLINE_META = ("author", "article:author", "byl", "dc.creator", "parsely-author")
+ARTICLE_DATE_META = (
+    "article:published_time", "og:published_time", "datepublished", "date", "pubdate",
+    "publishdate", "dc.date", "dcterms.created", "parsely-pub-date", "sailthru.date",
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+class _Block:
+    """
+    Block element in the article tree. content holds text fragments and
+    child blocks in document order.
+    """
+    __slots__ = ("tag", "parent", "content", "weight", "own_len", "own_link",
+                 "text_len", "link_len", "commas", "score", "scored")
+
+    def __init__(self, tag, parent, weight):
+        self.tag = tag
+        self.parent = parent
+        self.content = []
+        self.weight = weight
+        self.own_len = 0
+        self.own_link = 0
+        self.text_len = 0
+        self.link_len = 0
+        self.commas = 0
+        self.score = 0.0
+        self.scored = False
+
+    @property
+    def link_density(self):
+        return self.link_len / self.text_len if self.text_len else 0.0
+
+    @property
+    def final_score(self):
+        return (self.score + self.weight) * (1 - self.link_density)
+
+class _ArticleTreeBuilder(HTMLParser):
+    """
+    Streaming tokenizer that builds the block tree, scores blocks as they
+    close, and collects the metadata candidates.
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Block("#root", None, 0)
+        self.stack = [self.root]
+        self.candidates = []
+        self.paragraphs = []
+        self.meta = {}
+        self.title_parts = None
+        self.title = ""
+        self.first_h1 = None
+        self.byline_block = None
+        self.time_datetime = None
+        self.json_ld = []
+        self._ld_parts = None
+        self._link_depth = 0
+        self._skip_depth = 0
+        # Open blocks per tag, so an end tag with nothing to close is
+        # dropped without scanning the stack.
+        self._open = {}
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_depth:
+            if tag in SKIPPED_TAGS:
+                self._skip_depth += 1
+            return
+        attrs = dict(attrs)
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = 1
+            if tag == "script" and (attrs.get("type") or "").lower() == "application/ld+json":
+                self._ld_parts = []
+            return
+        if tag == "meta":
+            key = (attrs.get("property") or attrs.get("name") or attrs.get("itemprop") or "").lower()
+            if key and attrs.get("content") and key not in self.meta:
+                self.meta[key] = attrs["content"].strip()
+            return
+        if tag == "title":
+            self.title_parts = []
+            return
+        if tag == "time" and self.time_datetime is None and attrs.get("datetime"):
+            self.time_datetime = attrs["datetime"].strip()
+        if tag == "br":
+            self.stack[-1].content.append("\n")
+            return
+        if tag in ARTICLE_VOID_TAGS:
+            return
+        if tag == "a":
+            self._link_depth += 1
+            return
+        if tag in ARTICLE_INLINE_TAGS:
+            return
+        if tag in ARTICLE_P_CLOSERS and self.stack[-1].tag == "p":
+            self._close(len(self.stack) - 1)
+        elif tag == "li" and self.stack[-1].tag == "li":
+            self._close(len(self.stack) - 1)
+        hints = f"{attrs.get('class') or ''} {attrs.get('id') or ''}"
+        weight = ARTICLE_TAG_WEIGHTS.get(tag, 0)
+        if hints.strip():
+            if ARTICLE_NEGATIVE_CLASSES.search(hints):
+                weight -= 25
+            if ARTICLE_POSITIVE_CLASSES.search(hints):
+                weight += 25
+        parent = self.stack[-1]
+        block = _Block(tag, parent, weight)
+        parent.content.append(block)
+        self.stack.append(block)
+        self._open[tag] = self._open.get(tag, 0) + 1
+        if tag == "h1" and self.first_h1 is None:
+            self.first_h1 = block
+        if self.byline_block is None and (
+                attrs.get("rel") == "author" or ARTICLE_BYLINE_CLASSES.search(hints)):
+            self.byline_block = block
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in ARTICLE_VOID_TAGS and not self._skip_depth:
+            self.handle_endtag(tag)
+        elif tag in SKIPPED_TAGS and self._skip_depth:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self._skip_depth:
+            if tag in SKIPPED_TAGS:
+                self._skip_depth -= 1
+                if not self._skip_depth and self._ld_parts is not None:
+                    self.json_ld.append("".join(self._ld_parts))
+                    self._ld_parts = None
+            return
+        if tag == "title":
+            if self.title_parts is not None:
+                self.title = _WHITESPACE.sub(" ", "".join(self.title_parts)).strip()
+            self.title_parts = None
+            return
+        if tag == "a":
+            self._link_depth = max(0, self._link_depth - 1)
+            return
+        if tag in ARTICLE_INLINE_TAGS or tag in ARTICLE_VOID_TAGS or not self._open.get(tag):
+            return
+        # Everything above the match is closed with it, so over the whole
+        # document the scan costs no more than the blocks it pops.
+        for index in range(len(self.stack) - 1, 0, -1):
+            if self.stack[index].tag == tag:
+                self._close(index)
+                return
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            if self._ld_parts is not None:
+                self._ld_parts.append(data)
+            return
+        if self.title_parts is not None:
+            self.title_parts.append(data)
+            return
+        block = self.stack[-1]
+        text = _WHITESPACE.sub(" ", data)
+        block.content.append(text)
+        length = len(text.strip())
+        block.own_len += length
+        block.commas += text.count(",")
+        if self._link_depth:
+            block.own_link += length
+
+    def _close(self, index):
+        # Close the blocks from the top of the stack down to stack[index].
+        while len(self.stack) > index:
+            block = self.stack.pop()
+            self._open[block.tag] -= 1
+            self._finish(block)
+
+    def _finish(self, block):
+        block.text_len += block.own_len
+        block.link_len += block.own_link
+        parent = block.parent
+        parent.text_len += block.text_len
+        parent.link_len += block.link_len
+        parent.commas += block.commas
+        if block.tag == "p":
+            self.paragraphs.append(block)
+        if block.text_len < ARTICLE_MIN_UNIT_CHARS:
+            return
+        if block.tag in ARTICLE_UNIT_TAGS:
+            container = parent
+        elif block.own_len >= ARTICLE_MIN_UNIT_CHARS and block.own_len * 2 >= block.text_len:
+            # A block holding its own text directly (e.g. <div>text<br>text</div>).
+            container = block
+        else:
+            return
+        unit = (1 + block.commas + min(block.text_len // 100, 3)) * (1 - block.link_density)
+        self._credit(container, unit)
+        if container.parent is not None:
+            self._credit(container.parent, unit / 2)
+
+    def _credit(self, block, amount):
+        if not block.scored:
+            block.scored = True
+            self.candidates.append(block)
+        block.score += amount
+
+    def close(self):
+        super().close()
+        self._close(1)
+        self.root.text_len += self.root.own_len
+        self.root.link_len += self.root.own_link
+
+def _render_blocks(blocks, boilerplate=True):
+    """
+    Text of the given blocks, one line per block-level run of text. With
+    boilerplate set, sub-blocks that look like boilerplate are skipped.
+    Iterative, so deeply nested pages can't exhaust the stack.
+    """
+    lines = []
+    line = []
+
+    def flush():
+        text = "".join(line).strip()
+        if text:
+            lines.extend(part.strip() for part in text.split("\n") if part.strip())
+        line.clear()
+
+    stack = [iter(blocks)]
+    while stack:
+        item = next(stack[-1], None)
+        if item is None:
+            stack.pop()
+            flush()
+            continue
+        if isinstance(item, str):
+            line.append(item)
+            continue
+        if boilerplate and (
+                item.tag in ARTICLE_DROP_TAGS or item.weight < -5
+                or (item.tag not in ARTICLE_UNIT_TAGS and item.link_density > ARTICLE_MAX_LINK_DENSITY)):
+            continue
+        flush()
+        stack.append(iter(item.content))
+    return "\n".join(lines)
+
+def _feed_lexbor(builder, content):
+    """
+    Drive the builder from selectolax's (much faster, C) parse instead of
+    the stdlib tokenizer: the tree is walked iteratively, replaying its
+    start tags, text and end tags.
+    """
+    tree = LexborHTMLParser(_decode_html(content))
+    for node in tree.css('script[type="application/ld+json"]'):
+        builder.json_ld.append(node.text(deep=True))
+    tree.strip_tags(list(SKIPPED_TAGS))
+    open_nodes = []
+    node = tree.root
+    while node is not None or open_nodes:
+        if node is None:
+            node = open_nodes.pop()
+            builder.handle_endtag(node.tag)
+            node = node.next
+            continue
+        tag = node.tag
+        if tag == "-text":
+            builder.handle_data(node.text_content or "")
+        elif not tag.startswith(("-", "_", "!")):
+            builder.handle_starttag(tag, node.attributes.items())
+            if node.child is not None:
+                open_nodes.append(node)
+                node = node.child
+                continue
+            builder.handle_endtag(tag)
+        node = node.next
+
+def _json_ld_fields(documents):
+    """
+    headline / author / datePublished from JSON-LD blocks, where present.
+    """
+    fields = {}
+    pending = []
+    for document in documents:
+        try:
+            pending.append(json.loads(document))
+        except ValueError:
+            continue
+    while pending:
+        item = pending.pop()
+        if isinstance(item, list):
+            pending.extend(item)
+            continue
+        if not isinstance(item, dict):
+            continue
+        if "@graph" in item:
+            pending.append(item["@graph"])
+        for key in ("headline", "datePublished"):
+            if isinstance(item.get(key), str):
+                fields.setdefault(key, item[key])
+        author = item.get("author")
+        if isinstance(author, list) and author:
+            author = author[0]
+        if isinstance(author, dict):
+            author = author.get("name")
+        if isinstance(author, str) and "headline" in item:
+            fields.setdefault("author", author)
+    return fields
+
+def _first_meta(meta, keys):
+    for key in keys:
+        value = meta.get(key)
+        if value:
+            return value
+    return None
+
+def extract_article(content, engine=None, parser=None):
+    """
+    Extract the main article from an HTML document. Returns a dict with
+    "text" plus "title", "byline" and "published" (None when not found;
+    the heuristic engine only fills in "text"). The density engine parses
+    with selectolax when that is the chosen backend, else with the stdlib
+    tokenizer; the two agree on well-formed pages.
+    """
+    engine = engine or ARTICLE_ENGINE
+    if engine not in ARTICLE_ENGINES:
+        raise ValueError(f"Unknown article engine: {engine}")
+    if engine == "heuristic":
+        return {"title": None, "byline": None, "published": None,
+                "text": extract_article_text(content, parser=parser, engine="heuristic")}
+
+    builder = _ArticleTreeBuilder()
+    if resolve_parser(parser) == "selectolax":
+        _feed_lexbor(builder, content)
+    else:
+        builder.feed(_decode_html(content))
+    builder.close()
+
+    text = ""
+    if builder.candidates:
+        top = max(builder.candidates, key=lambda block: block.final_score)
+        # Pull in siblings that score well too (articles split over several
+        # containers), plus plain paragraphs next to the winner.
+        threshold = max(10.0, top.final_score * 0.2)
+        parent = top.parent
+        siblings = [top] if parent is None else [
+            block for block in parent.content
+            if isinstance(block, _Block) and (
+                block is top
+                or (block.scored and block.weight >= 0 and block.final_score >= threshold)
+                or (block.tag == "p" and block.text_len > 80 and block.link_density < 0.25))
+        ]
+        text = _render_blocks(siblings)
+    if len(text) < ARTICLE_MIN_TEXT_CHARS:
+        # Nothing (or only a banner) long enough to score: fall back to
+        # every paragraph, like the heuristic engine.
+        text = _render_blocks(builder.paragraphs, boilerplate=False)
+
+    json_ld = _json_ld_fields(builder.json_ld)
+    meta = builder.meta
+    title = _first_meta(meta, ARTICLE_TITLE_META) or json_ld.get("headline") or builder.title
+    if not title and builder.first_h1 is not None:
+        title = _render_blocks([builder.first_h1], boilerplate=False)
+    byline = _first_meta(meta, ARTICLE_BYLINE_META)
+    if byline and byline.startswith(("http://", "https://")):
+        byline = None
+    byline = byline or json_ld.get("author")
+    if not byline and builder.byline_block is not None:
+        byline = _render_blocks([builder.byline_block], boilerplate=False)
+        byline = re.sub(r"^by\s+", "", byline, flags=re.I) or None
+    published = _first_meta(meta, ARTICLE_DATE_META) or json_ld.get("datePublished") or builder.time_datetime
+    return {"title": title or None, "byline": byline, "published": published, "text": text}
+
+################################################################################
+#  IMAGE CANDIDATES
+#  scrape_images looks at every <img> before fetching anything: lazy-load
+#  attributes, srcset and <picture> sources are resolved to the one URL
+#  worth downloading, data: URIs are decoded in place, and tags that
+#  declare a tiny size are dropped. Downloads are then checked again on
+#  their headers and first bytes, before the body is read.
+################################################################################
+# Width (in CSS pixels) srcset candidates are chosen for.
+IMAGE_TARGET_WIDTH = int(os.environ.get("IMAGE_TARGET_WIDTH", "1600"))
+# Smaller images (tracking pixels, spacers, icons) are skipped.
+IMAGE_MIN_WIDTH = int(os.environ.get("IMAGE_MIN_WIDTH", "32"))
+IMAGE_MIN_HEIGHT = int(os.environ.get("IMAGE_MIN_HEIGHT", "32"))
+# How much of a download is inspected for its dimensions.
+IMAGE_SNIFF_BYTES = 64 * 1024
+
+# Attributes lazy-loading scripts keep the real image URL in.
+LAZY_SRC_ATTRIBUTES = ("data-src", "data-lazy-src", "data-original", "data-url")
+LAZY_SRCSET_ATTRIBUTES = ("data-srcset", "data-lazy-srcset")
+
+CONTENT_TYPE_EXTENSIONS = {
+    "image/jpeg": ".jpg", "image/jpg": ".jpg", "image/pjpeg": ".jpg",
+    "image/png": ".png", "image/gif": ".gif", "image/webp": ".webp",
+    "image/avif": ".avif", "image/svg+xml": ".svg", "image/bmp": ".bmp",
+    "image/tiff": ".tif", "image/x-icon": ".ico", "image/vnd.microsoft.icon": ".ico",
+}
+
+def parse_srcset(value):
+    """
+    Split a srcset attribute into (url, descriptor) pairs. URLs may contain
+    commas, so this follows the HTML spec's tokenizer rather than split().
+    """
+    candidates = []
+    pos, n = 0, len(value)
+    while pos < n:
+        while pos < n and (value[pos].isspace() or value[pos] == ","):
+            pos += 1
+        start = pos
+        while pos < n and not value[pos].isspace():
+            pos += 1
+        url = value[start:pos]
+        if not url:
+            break
+        descriptor = ""
+        if url.endswith(","):
+            url = url.rstrip(",")
+        else:
+            end = value.find(",", pos)
+            end = n if end == -1 else end
+            descriptor = value[pos:end].strip()
+            pos = end
+        if url:
+            candidates.append((url, descriptor))
+    return candidates
+
+def pick_srcset_candidate(candidates, target_width, base_width=None):
+    """
+    Choose the smallest candidate at least target_width pixels wide, or the
+    widest one if none is. Density descriptors ("2x") are turned into
+    widths using base_width, the <img> width attribute; without it the
+    highest density wins.
+    """
+    sized = []
+    for url, descriptor in candidates:
+        width, density = None, 1.0
+        for token in descriptor.split():
+            try:
+                if token.endswith("w"):
+                    width = int(token[:-1])
+                elif token.endswith("x"):
+                    density = float(token[:-1])
+            except ValueError:
+                continue
+        if width is None and base_width:
+            width = int(base_width * density)
+        sized.append((width, density, url))
+    if not sized:
+        return None
+    with_width = [c for c in sized if c[0]]
+    if with_width:
+        large_enough = [c for c in with_width if c[0] >= target_width]
+        return (min(large_enough) if large_enough else max(with_width))[2]
+    return max(sized, key=lambda c: c[1])[2]
+
+def _int_attribute(attrs, name):
+    try:
+        return int(str(attrs.get(name, "")).strip().removesuffix("px"))
+    except ValueError:
+        return None
+
+def image_candidate(attrs, target_width=None):
+    """
+    The URL (possibly a data: URI) to download for an <img>, or None. Real
+    URLs in lazy-load attributes win over src, which then usually holds a
+    placeholder; srcset and <picture> candidates win over both.
+    """
+    target_width = target_width or IMAGE_TARGET_WIDTH
+    srcsets = [attrs.get(name) for name in ("picture_srcset", "srcset") + LAZY_SRCSET_ATTRIBUTES]
+    candidates = [c for srcset in srcsets if srcset for c in parse_srcset(srcset)]
+    if candidates:
+        url = pick_srcset_candidate(candidates, target_width, _int_attribute(attrs, "width"))
+        if url:
+            return url
+    for name in LAZY_SRC_ATTRIBUTES + ("src",):
+        url = (attrs.get(name) or "").strip()
+        if url:
+            return url
+    return None
+
+def declared_too_small(attrs, min_width, min_height):
+    """
+    True when the tag's width/height attributes put it under the minimum.
+    """
+    width = _int_attribute(attrs, "width")
+    height = _int_attribute(attrs, "height")
+    return (width is not None and width < min_width) or (height is not None and height < min_height)
+
+def decode_data_uri(uri):
+    """
+    Decode a data: URI into (content_type, bytes).
+    """
+    header, _, payload = uri[5:].partition(",")
+    params = header.split(";")
+    content_type = params[0].strip().lower() or "text/plain"
+    if "base64" in params[1:]:
+        return content_type, base64.b64decode(payload + "=" * (-len(payload) % 4))
+    return content_type, unquote_to_bytes(payload)
+
+def sniff_image_size(head):
+    """
+    (width, height) read from the first bytes of a PNG, GIF, JPEG, WebP or
+    BMP file, or None if they don't say.
+    """
+    try:
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head.startswith(b"BM"):
+            width, height = struct.unpack("<ii", head[18:26])
+            return width, abs(height)
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            chunk = head[12:16]
+            if chunk == b"VP8 ":
+                width, height = struct.unpack("<HH", head[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b"VP8L":
+                bits = int.from_bytes(head[21:25], "little")
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                return (int.from_bytes(head[24:27], "little") + 1,
+                        int.from_bytes(head[27:30], "little") + 1)
+        if head.startswith(b"\xff\xd8"):
+            pos = 2
+            while pos + 9 < len(head):
+                if head[pos] != 0xFF:
+                    return None
+                marker = head[pos + 1]
+                if marker == 0xFF:
+                    pos += 1
+                    continue
+                if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                    pos += 2
+                    continue
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    height, width = struct.unpack(">HH", head[pos + 5:pos + 9])
+                    return width, height
+                pos += 2 + struct.unpack(">H", head[pos + 2:pos + 4])[0]
+    except struct.error:
+        return None
+    return None
+
+# Leading bytes of the formats servers most often send without a proper
+# Content-Type.
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"), (b"\x89PNG\r\n\x1a\n", ".png"), (b"GIF8", ".gif"),
+    (b"BM", ".bmp"), (b"II*\x00", ".tif"), (b"MM\x00*", ".tif"),
+)
+
+def sniff_image_extension(head):
+    """
+    Extension for the image format head starts with, or None.
+    """
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    for signature, ext in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    return None
+
+def image_extension(content_type, url, head=b""):
+    """
+    File extension for a downloaded image: from its Content-Type, else its
+    first bytes, else the URL path, else .jpg.
+    """
+    ext = CONTENT_TYPE_EXTENSIONS.get(content_type) or sniff_image_extension(head)
+    if ext:
+        return ext
+    ext = os.path.splitext(urlparse(url).path)[1].lower()
+    return ext if ext in IMAGE_EXTENSIONS or ext in (".avif", ".ico") else ".jpg"
+
+def peek_chunks(chunks, size):
+    """
+    Read at least size bytes (if there are that many) from an iterator of
+    chunks. Returns (head, chunks) where chunks still yields everything,
+    head included.
+    """
+    chunks = iter(chunks)
+    seen = []
+    total = 0
+    for chunk in chunks:
+        seen.append(chunk)
+        total += len(chunk)
+        if total >= size:
+            break
+    return b"".join(seen), chain(seen, chunks)
+
+################################################################################
+#  UPLOAD HANDLING
 ################################################################################
-ALL_LOGS = []
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Zip members are decompressed to disk in chunks of this many bytes.
+ZIP_CHUNK_SIZE = 256 * 1024
 
-def add_log(entry_type, message):
+# Worker processes used for large PDFs, and the page count at which the
+# process pool starts paying for itself.
+PDF_WORKERS = os.cpu_count() or 1
+PDF_PARALLEL_MIN_PAGES = 64
+
+SUPPORTED_UPLOADS = ("pdf", "pptx", "docx")
+
+IMAGE_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff",
+    ".webp", ".svg", ".emf", ".wmf",
+}
+
+def save_upload(file_storage, suffix=""):
+    """
+    Copy an uploaded FileStorage to a temporary file on disk in chunks and
+    return its path. The upload is never read into memory as a whole; the
+    caller is responsible for removing the file.
+    """
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as f_out:
+            file_storage.save(f_out, buffer_size=UPLOAD_CHUNK_SIZE)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+@contextmanager
+def spool_upload(file_storage, suffix=""):
+    """
+    Like save_upload, but yield the path and remove the temporary file when
+    the block exits.
     """
-    Add a log entry with a type/category and message.
+    path = save_upload(file_storage, suffix)
+    try:
+        yield path
+    finally:
+        discard_upload(path)
+
+def discard_upload(path):
     """
-    ALL_LOGS.append({"type": entry_type, "message": message})
+    Remove a file made by save_upload, if it is still there.
+    """
+    if os.path.exists(path):
+        os.remove(path)
 
 ################################################################################
 #  HTML TEMPLATE
 ################################################################################
+# Stylesheet and script are served as separate, cacheable assets so the
+# page itself stays small.
+APP_CSS = """
+body {
+  font-family: Arial, sans-serif;
+  background: #141414;
+  color: #fff;
+  margin: 0; 
+  padding: 0;
+}
+header {
+  background: linear-gradient(45deg, #6a0dad, #b53471);
+  color: #fff;
+  padding: 10px 20px;
+  display: flex;
+  justify-content: space-between;
+  align-items: center;
+}
+h1 {
+  margin: 0;
+}
+nav a {
+  margin-left: 20px;
+  font-weight: bold;
+  color: #fff;
+  text-decoration: none;
+}
+nav a:hover {
+  color: #e6e6e6;
+}
+.container {
+  max-width: 960px;
+  margin: 20px auto;
+  padding: 20px;
+}
+.tabs {
+  display: flex;
+  border-bottom: 1px solid #333;
+  margin-bottom: 15px;
+}
+.tabs button {
+  background: none;
+  border: none;
+  color: #fff;
+  padding: 10px 20px;
+  cursor: pointer;
+  font-size: 1em;
+  transition: background 0.3s;
+  outline: none;
+}
+.tabs button:hover,
+.tabs button.active {
+  background: #333;
+}
+.tab-content {
+  display: none;
+}
+.tab-content.active {
+  display: block;
+}
+.upload-area {
+  border: 2px dashed #9b59b6;
+  border-radius: 10px;
+  padding: 40px;
+  text-align: center;
+  background: #1f1f1f;
+  transition: background-color 0.3s ease;
+  cursor: pointer;
+  margin-bottom: 15px;
+}
+.upload-area p {
+  font-size: 1.2em;
+  color: #a39fa7;
+}
+.upload-area input {
+  display: none;
+}
+.file-icon {
+  font-size: 3em;
+  display: block;
+  margin: 10px auto;
+  color: #bb99ff;
+}
+label {
+  display: block;
+  margin-top: 1em;
+  font-weight: bold;
+}
+label.inline {
+  font-weight: normal;
+}
+input[type="text"], input[type="url"] {
+  width: 100%;
+  padding: 8px;
+  margin-top: 5px;
+  border: 1px solid #444;
+  border-radius: 5px;
+  background: #1f1f1f;
+  color: #fff;
+}
+.btn {
+  padding: 10px 20px;
+  background: #9b59b6;
+  border: none;
+  color: #fff;
+  cursor: pointer;
+  border-radius: 5px;
+  margin-top: 10px;
+  transition: background 0.3s, transform 0.3s;
+}
+.btn:hover {
+  background: #8655a3;
+  transform: scale(1.05);
+}
+.logs {
+  background: #1f1f1f;
+  padding: 10px;
+  border-radius: 10px;
+  margin-top: 20px;
+  max-height: 300px;
+  overflow-y: auto;
+}
+.log-entry {
+  border-bottom: 1px solid #333;
+  padding: 5px 0;
+}
+.log-entry:last-child {
+  border: none;
+}
+.log-type {
+  font-weight: bold;
+  margin-right: 5px;
+  color: #ffcc00;
+}
+.log-message {
+  color: #fff;
+}
+.log-duration {
+  color: #a39fa7;
+}
+.success {
+  color: #4cd137;
+}
+.error {
+  color: #e84118;
+}
+.status-message {
+  margin-top: 10px;
+  font-weight: bold;
+}
+"""
+
+APP_JS = """
+function switchTab(tabId){
+  const tabs = document.querySelectorAll('.tab-content');
+  tabs.forEach(t => t.classList.remove('active'));
+
+  const buttons = document.querySelectorAll('.tabs button');
+  buttons.forEach(b => b.classList.remove('active'));
+
+  document.getElementById(tabId).classList.add('active');
+  const btn = Array.from(buttons).find(b => b.textContent.trim() === document.getElementById(tabId).querySelector('h2').textContent.trim());
+  if(btn){
+    btn.classList.add('active');
+  }
+}
+
+// Live progress for file extraction: post the form to the API with
+// Accept: text/event-stream and read the events as they arrive. Cancel
+// aborts the request, which stops the extraction on the server.
+function parseEvents(buffer, onEvent){
+  const messages = buffer.split('\\n\\n');
+  messages.slice(0, -1).forEach(message => {
+    let name = 'message', data = '';
+    message.split('\\n').forEach(line => {
+      if(line.startsWith('event: ')) name = line.slice(7);
+      if(line.startsWith('data: ')) data += line.slice(6);
+    });
+    onEvent(name, data ? JSON.parse(data) : null);
+  });
+  return messages[messages.length - 1];
+}
+
+async function extractWithProgress(form){
+  const box = document.getElementById('extract_progress');
+  const bar = box.querySelector('progress');
+  const status = box.querySelector('.status-message');
+  const cancel = box.querySelector('button');
+  const controller = new AbortController();
+  let images = 0;
+  box.style.display = 'block';
+  bar.removeAttribute('value');
+  status.textContent = 'Uploading...';
+  cancel.onclick = () => controller.abort();
+  const show = (name, data) => {
+    if(name === 'progress' && data.type === 'partial'){
+      status.textContent = `Stopped early (${data.stopped_by} limit): ${images} images extracted.`;
+    } else if(name === 'progress'){
+      const done = data.page || data.index, total = data.pages || data.total;
+      images += data.images ? data.images.length : (data.type === 'image' ? 1 : 0);
+      bar.max = total;
+      bar.value = done;
+      status.textContent = `${done} / ${total} ${data.pages ? 'pages' : 'files'}, ${images} images (${data.elapsed}s)`;
+    } else if(name === 'done' && !status.textContent.startsWith('Stopped')){
+      status.textContent = `Done: ${images} images extracted.`;
+    } else if(name === 'error'){
+      status.textContent = `Error: ${data.error}`;
+    }
+  };
+  try {
+    const response = await fetch(form.dataset.stream, {
+      method: 'POST', body: new FormData(form), signal: controller.signal,
+      headers: {'Accept': 'text/event-stream'},
+    });
+    if(!response.ok){
+      status.textContent = `Error: ${(await response.json()).error}`;
+      return;
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for(;;){
+      const {value, done} = await reader.read();
+      if(done) break;
+      buffer = parseEvents(buffer + decoder.decode(value, {stream: true}), show);
+    }
+  } catch(e){
+    status.textContent = e.name === 'AbortError' ? 'Cancelled.' : `Error: ${e}`;
+  }
+}
+
+document.addEventListener('submit', event => {
+  const form = event.target;
+  if(form.dataset.stream && form.elements.progress && form.elements.progress.checked
+     && !form.elements.download.checked && !form.elements.text.checked){
+    event.preventDefault();
+    extractWithProgress(form);
+  }
+});
+"""
+
 HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8"/>
     <title>All-in-One Utility</title>
-    <style>
-        body {
-          font-family: Arial, sans-serif;
-          background: #141414;
-          color: #fff;
-          margin: 0; 
-          padding: 0;
-        }
-        header {
-          background: linear-gradient(45deg, #6a0dad, #b53471);
-          color: #fff;
-          padding: 10px 20px;
-          display: flex;
-          justify-content: space-between;
-          align-items: center;
-        }
-        h1 {
-          margin: 0;
-        }
-        nav a {
-          margin-left: 20px;
-          font-weight: bold;
-          color: #fff;
-          text-decoration: none;
-        }
-        nav a:hover {
-          color: #e6e6e6;
-        }
-        .container {
-          max-width: 960px;
-          margin: 20px auto;
-          padding: 20px;
-        }
-        .tabs {
-          display: flex;
-          border-bottom: 1px solid #333;
-          margin-bottom: 15px;
-        }
-        .tabs button {
-          background: none;
-          border: none;
-          color: #fff;
-          padding: 10px 20px;
-          cursor: pointer;
-          font-size: 1em;
-          transition: background 0.3s;
-          outline: none;
-        }
-        .tabs button:hover,
-        .tabs button.active {
-          background: #333;
-        }
-        .tab-content {
-          display: none;
-        }
-        .tab-content.active {
-          display: block;
-        }
-        .upload-area {
-          border: 2px dashed #9b59b6;
-          border-radius: 10px;
-          padding: 40px;
-          text-align: center;
-          background: #1f1f1f;
-          transition: background-color 0.3s ease;
-          cursor: pointer;
-          margin-bottom: 15px;
-        }
-        .upload-area p {
-          font-size: 1.2em;
-          color: #a39fa7;
-        }
-        .upload-area input {
-          display: none;
-        }
-        .file-icon {
-          font-size: 3em;
-          display: block;
-          margin: 10px auto;
-          color: #bb99ff;
-        }
-        label {
-          display: block;
-          margin-top: 1em;
-          font-weight: bold;
-        }
-        input[type="text"], input[type="url"] {
-          width: 100%;
-          padding: 8px;
-          margin-top: 5px;
-          border: 1px solid #444;
-          border-radius: 5px;
-          background: #1f1f1f;
-          color: #fff;
-        }
-        .btn {
-          padding: 10px 20px;
-          background: #9b59b6;
-          border: none;
-          color: #fff;
-          cursor: pointer;
-          border-radius: 5px;
-          margin-top: 10px;
-          transition: background 0.3s, transform 0.3s;
-        }
-        .btn:hover {
-          background: #8655a3;
-          transform: scale(1.05);
-        }
-        .logs {
-          background: #1f1f1f;
-          padding: 10px;
-          border-radius: 10px;
-          margin-top: 20px;
-          max-height: 300px;
-          overflow-y: auto;
-        }
-        .log-entry {
-          border-bottom: 1px solid #333;
-          padding: 5px 0;
-        }
-        .log-entry:last-child {
-          border: none;
-        }
-        .log-type {
-          font-weight: bold;
-          margin-right: 5px;
-          color: #ffcc00;
-        }
-        .log-message {
-          color: #fff;
-        }
-        .success {
-          color: #4cd137;
-        }
-        .error {
-          color: #e84118;
-        }
-        .status-message {
-          margin-top: 10px;
-          font-weight: bold;
-        }
-    </style>
+    <link rel="stylesheet" href="{{ url_for('asset', name='app.css') }}"/>
 </head>
 <body>
 <header>
@@ -195,17 +2456,31 @@ HTML_TEMPLATE = """
   <!-- FILE IMAGE EXTRACT TAB -->
   <div id="tab-file-extract" class="tab-content active">
     <h2>Extract Images from .pdf, .pptx, or .docx</h2>
-    <form action="{{ url_for('extract_images') }}" method="POST" enctype="multipart/form-data">
+    <form action="{{ url_for('extract_images') }}" method="POST" enctype="multipart/form-data"
+          data-stream="{{ url_for('api_extract_images') }}">
       <div class="upload-area" onclick="document.getElementById('file_input').click()">
         <p>Drag & Drop or Click to choose a PDF, PPTX, or DOCX file</p>
         <span class="file-icon">&#128196;</span>
         <input type="file" id="file_input" name="file" accept=".pdf, .pptx, .docx"/>
       </div>
+      <label class="inline"><input type="checkbox" name="download" value="zip"> Download as ZIP</label>
+      <label class="inline"><input type="checkbox" name="text" value="1"> Also extract text</label>
+      <label class="inline"><input type="checkbox" name="progress" value="1" checked> Show live progress</label>
       <button type="submit" class="btn">Extract Images</button>
     </form>
+    <div id="extract_progress" style="display:none; margin-top:10px;">
+      <progress style="width:100%;"></progress>
+      <p class="status-message"></p>
+      <button type="button" class="btn">Cancel</button>
+    </div>
     {% if file_extract_status %}
       <p class="status-message">{{ file_extract_status }}</p>
     {% endif %}
+    {% if file_text %}
+      <div style="margin-top:15px; white-space:pre-wrap;">
+        {{ file_text }}
+      </div>
+    {% endif %}
   </div>
 
   <!-- YOUTUBE TRANSCRIPT TAB -->
@@ -244,192 +2519,1618 @@ HTML_TEMPLATE = """
     {% endif %}
   </div>
 
-  <!-- WEBSITE IMAGE SCRAPER TAB -->
-  <div id="tab-webpics" class="tab-content">
-    <h2>Scrape Images from Website</h2>
-    <form action="{{ url_for('internet_images') }}" method="POST">
-      <label for="website_url">Website URL:</label>
-      <input type="url" id="website_url" name="website_url" required>
-      <button type="submit" class="btn">Scrape Images</button>
-    </form>
-    {% if webpics_status %}
-      <p class="status-message">{{ webpics_status }}</p>
-    {% endif %}
-  </div>
+  <!-- WEBSITE IMAGE SCRAPER TAB -->
+  <div id="tab-webpics" class="tab-content">
+    <h2>Scrape Images from Website</h2>
+    <form action="{{ url_for('internet_images') }}" method="POST">
+      <label for="website_url">Website URL:</label>
+      <input type="url" id="website_url" name="website_url" required>
+      <label class="inline"><input type="checkbox" name="download" value="zip"> Download as ZIP</label>
+      <button type="submit" class="btn">Scrape Images</button>
+    </form>
+    {% if webpics_status %}
+      <p class="status-message">{{ webpics_status }}</p>
+    {% endif %}
+  </div>
+
+  <!-- LOGS TAB -->
+  <div id="tab-logs" class="tab-content">
+    <h2>All Logs</h2>
+    <div class="logs">
+      {% for log in logs %}
+        <div class="log-entry">
+          <span class="log-type">[{{ log.type|upper }}]</span>
+          <span class="log-message">{{ log.message }}</span>
+          {% if log.duration is not none %}
+            <span class="log-duration">({{ '%.2f'|format(log.duration) }}s)</span>
+          {% endif %}
+        </div>
+      {% endfor %}
+    </div>
+  </div>
+</div>
+
+<script src="{{ url_for('asset', name='app.js') }}"></script>
+</body>
+</html>
+"""
+
+ASSETS = {
+    "app.css": (APP_CSS, "text/css"),
+    "app.js": (APP_JS, "application/javascript"),
+}
+ASSET_MAX_AGE = 24 * 60 * 60
+
+_PAGE_TEMPLATE = None
+
+def get_page_template():
+    """
+    Return HTML_TEMPLATE compiled once by the app's Jinja environment.
+    """
+    global _PAGE_TEMPLATE
+    if _PAGE_TEMPLATE is None:
+        _PAGE_TEMPLATE = app.jinja_env.from_string(HTML_TEMPLATE)
+    return _PAGE_TEMPLATE
+
+PAGE_FIELDS = (
+    "file_extract_status", "file_text", "youtube_status", "youtube_transcript",
+    "article_status", "article_text", "webpics_status",
+)
+
+def wants_json():
+    """
+    True when the client asked for JSON (?format=json or an Accept header
+    preferring application/json) instead of the HTML page.
+    """
+    if request.args.get("format") == "json":
+        return True
+    best = request.accept_mimetypes.best_match(["text/html", "application/json"])
+    return best == "application/json" and request.accept_mimetypes[best] > request.accept_mimetypes["text/html"]
+
+def render_page(status=200, **fields):
+    """
+    Render the main page with the given result fields filled in, or return
+    just those fields as JSON to API clients. status only applies to JSON
+    responses; the HTML page always shows errors inline.
+    """
+    if wants_json():
+        return jsonify({k: v for k, v in fields.items() if v is not None}), status
+    context = {name: None for name in PAGE_FIELDS}
+    context.update(fields)
+    return render_template(get_page_template(), logs=LOGS.recent(LOG_RENDER_LIMIT), **context)
+
+def missing_input(message):
+    """
+    Log a missing form field and send the user back to the page, or answer
+    400 to API clients.
+    """
+    add_log("error", message)
+    if wants_json():
+        return jsonify({"error": message}), 400
+    return redirect(url_for("index"))
+
+################################################################################
+#  FUNCTIONS
+#  1) Extract images (and text) from PPTX / DOCX / PDF
+#  2) YouTube transcript
+#  3) Article scraping
+#  4) Internet images scraping
+################################################################################
+
+def iter_images_from_zip(in_memory_file, media_folder, output_folder,
+                         max_member_bytes=None, images_only=False, budget=None):
+    """
+    Extract images from a zipped office file (pptx/docx), yielding an
+    event per media member as soon as it has been handled:
+    {"type": "image", "index", "total", "name", "source", "bytes",
+    "duplicate_of", "elapsed"} or {"type": "skipped", "index", "total",
+    "source", "reason", "elapsed"}.
+    in_memory_file may be a path or a seekable file object, output_folder a
+    folder or a sink. Members are decompressed straight to the output in
+    ZIP_CHUNK_SIZE pieces. Entries whose declared size exceeds
+    max_member_bytes, or that are not images when images_only is set, are
+    skipped without being read. Closing the generator stops the work.
+    Members are charged to budget (a default Budget if None) by their
+    declared size, which zipfile never reads past; when it runs out the
+    events end with a "partial" one (see budgeted).
+    """
+    budget = budget or Budget()
+    sink = as_sink(output_folder)
+    start = time.perf_counter()
+    with zipfile.ZipFile(in_memory_file, "r") as z:
+        media_files = [
+            info for info in z.infolist()
+            if info.filename.startswith(media_folder) and not info.is_dir()
+        ]
+        yield from budgeted(_iter_zip_members(z, media_files, sink, max_member_bytes, images_only,
+                                              budget, start), budget)
+
+def _iter_zip_members(z, media_files, sink, max_member_bytes, images_only, budget, start):
+    total = len(media_files)
+    for index, info in enumerate(media_files, start=1):
+        event = {"index": index, "total": total, "source": info.filename}
+        filename = os.path.basename(info.filename)
+        if max_member_bytes is not None and info.file_size > max_member_bytes:
+            reason = "too large"
+        elif images_only and os.path.splitext(filename)[1].lower() not in IMAGE_EXTENSIONS:
+            reason = "not an image"
+        else:
+            reason = None
+            budget.spend("images")
+            budget.spend("decompressed", info.file_size)
+            with z.open(info) as src:
+                try:
+                    entry = sink.write(filename, iter(lambda: src.read(ZIP_CHUNK_SIZE), b""),
+                                       source=info.filename, max_bytes=max_member_bytes)
+                except DownloadTooLarge:
+                    # The header understated the size; don't trust it further.
+                    reason = "too large"
+        if reason:
+            event.update(type="skipped", reason=reason)
+        else:
+            event.update(type="image", name=entry["name"], bytes=entry["bytes"],
+                         duplicate_of=entry.get("duplicate_of"))
+        event["elapsed"] = round(time.perf_counter() - start, 3)
+        yield event
+
+def extract_images_from_zip(in_memory_file, media_folder, output_folder,
+                            max_member_bytes=None, images_only=False, budget=None):
+    """
+    Extract images from a zipped office file (pptx/docx) and return how
+    many were written; see iter_images_from_zip. Stops early, keeping what
+    was written, when budget runs out.
+    """
+    events = iter_images_from_zip(in_memory_file, media_folder, output_folder,
+                                  max_member_bytes, images_only, budget)
+    return sum(1 for event in events if event["type"] == "image")
+
+def open_pdf(source):
+    """
+    Open a PDF given a path or a file object. Paths are preferred since
+    PyMuPDF can then read the file lazily instead of from a bytes copy.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return fitz.open(source, filetype="pdf")
+    return fitz.open(stream=source.read(), filetype="pdf")
+
+def _page_image_jobs(doc, page_index, seen, jobs, repeats):
+    """
+    Add the first use of each of a page's images to jobs, as (page_index,
+    img_index, xref), and any later use to repeats, as (name, source,
+    first_source) for _record_repeats. seen maps xrefs to their first
+    source.
+    """
+    for img_index, img in enumerate(doc.get_page_images(page_index, full=True)):
+        xref = img[0]
+        source = f"page{page_index+1}:xref{xref}"
+        if xref in seen:
+            repeats.append((f"page{page_index+1}_{img_index}", source, seen[xref]))
+        else:
+            seen[xref] = source
+            jobs.append((page_index, img_index, xref))
+
+def _pdf_image_jobs(doc):
+    """
+    Return (jobs, repeats) for the whole document (see _page_image_jobs):
+    images reused across pages (logos, backgrounds) are decoded and
+    written once, and their other uses listed as repeats.
+    """
+    seen = {}
+    jobs = []
+    repeats = []
+    for page_index in range(len(doc)):
+        _page_image_jobs(doc, page_index, seen, jobs, repeats)
+    return jobs, repeats
+
+def _decode_pdf_images(doc, jobs, deadline=None):
+    """
+    Decode the images listed in jobs, yielding (filename, source, bytes).
+    Stops quietly once time.time() passes deadline.
+    """
+    for page_index, img_index, xref in jobs:
+        if deadline is not None and time.time() > deadline:
+            return
+        base_image = doc.extract_image(xref)
+        if not base_image:
+            continue
+        image_ext = base_image.get("ext", "png")
+        image_filename = f"page{page_index+1}_{img_index}.{image_ext}"
+        yield image_filename, f"page{page_index+1}:xref{xref}", base_image.get("image")
+
+def _iter_pdf_pages(doc, sink, budget, text=False):
+    """
+    Write each page's new images to the sink and yield one event per page:
+    {"type": "page", "page", "pages", "images", "bytes", "elapsed"}, plus
+    the page's "text" if text is set. Images are named and deduplicated as
+    by _pdf_image_jobs, and "images" includes the repeats. Pages, images
+    and decoded bytes are charged to budget.
+    """
+    start = time.perf_counter()
+    seen = {}
+    entries = {}
+    pages = len(doc)
+    for page_index in range(pages):
+        budget.spend("pages")
+        jobs = []
+        repeats = []
+        _page_image_jobs(doc, page_index, seen, jobs, repeats)
+        names = []
+        size = 0
+        for image_filename, source, image_bytes in _decode_pdf_images(doc, jobs):
+            budget.spend("images")
+            budget.spend("decompressed", len(image_bytes))
+            entry = entries[source] = sink.write(image_filename, [image_bytes], source)
+            names.append(entry["name"])
+            size += entry["bytes"]
+        names += _record_repeats(sink, repeats, entries)
+        event = {"type": "page", "page": page_index + 1, "pages": pages, "images": names,
+                 "bytes": size, "elapsed": round(time.perf_counter() - start, 3)}
+        if text:
+            event["text"] = doc[page_index].get_text().strip()
+        yield event
+
+def iter_images_from_pdf(in_memory_file, output_folder, budget=None):
+    """
+    Extract images from a PDF page by page, yielding an event per page as
+    soon as its images are written (see _iter_pdf_pages). Closing the
+    generator stops the work and closes the document. When budget (a
+    default Budget if None) runs out the events end with a "partial" one.
+    """
+    budget = budget or Budget()
+    sink = as_sink(output_folder)
+    with open_pdf(in_memory_file) as doc:
+        yield from budgeted(_iter_pdf_pages(doc, sink, budget), budget)
+
+_PDF_POOL = None
+_PDF_POOL_LOCK = threading.Lock()
+
+def get_pdf_pool():
+    """
+    The PDF worker processes, shared by all requests. They are spawned, not
+    forked, since forking a threaded server can copy locks held by other
+    threads into the child.
+    """
+    global _PDF_POOL
+    with _PDF_POOL_LOCK:
+        if _PDF_POOL is None:
+            _PDF_POOL = ProcessPoolExecutor(max_workers=PDF_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        return _PDF_POOL
+
+def _pdf_worker(pdf_path, jobs, staging, deadline=None):
+    """
+    Process pool entry point: open a private handle on the PDF, decode the
+    given slice of images into files in staging, stopping at deadline (a
+    time.time() value) or once staging is removed, and return (filename,
+    source, path, bytes, sha256) for each. Only these small tuples go back
+    to the parent, never the image data.
+    """
+    staged = []
+    with open_pdf(pdf_path) as doc:
+        for image_filename, source, image_bytes in _decode_pdf_images(doc, jobs, deadline):
+            path = os.path.join(staging, uuid.uuid4().hex)
+            try:
+                with open(path, "wb") as f:
+                    f.write(image_bytes)
+            except FileNotFoundError:
+                # The parent gave up on this request and removed staging.
+                break
+            staged.append((image_filename, source, path, len(image_bytes),
+                           hashlib.sha256(image_bytes).hexdigest()))
+    return staged
+
+def _split_jobs(jobs, parts):
+    """
+    Split jobs (ordered by page) into contiguous, roughly equal runs so
+    each worker handles its own page range.
+    """
+    size = -(-len(jobs) // parts)
+    return [jobs[i:i + size] for i in range(0, len(jobs), size)]
+
+def extract_images_from_pdf(in_memory_file, output_folder, workers=None, budget=None):
+    """
+    Extract images from PDF using PyMuPDF.
+    in_memory_file may be a path or a file object, output_folder a folder
+    or a sink. Each distinct image is written once, named after the first
+    page it appears on; its other uses get manifest entries pointing at it. When given a path to a large PDF, page ranges are
+    spread across a process pool in which every worker opens its own copy
+    of the document. Stops early, keeping what was written, when budget
+    (a default Budget if None) runs out. Returns how many images were
+    written, counted from the sink's manifest so images written before the
+    budget ran out partway through a page are included.
+    """
+    budget = budget or Budget()
+    sink = as_sink(output_folder)
+    workers = workers or PDF_WORKERS
+    written = len(sink.manifest)
+    try:
+        with open_pdf(in_memory_file) as doc:
+            jobs, repeats = _pdf_image_jobs(doc)
+            pages_left = budget.remaining("pages")
+            parallel = (
+                isinstance(in_memory_file, (str, os.PathLike))
+                and workers > 1
+                and len(doc) >= PDF_PARALLEL_MIN_PAGES
+                and len(jobs) > 1
+                and (pages_left is None or pages_left >= len(doc))
+            )
+            if not parallel:
+                for _ in _iter_pdf_pages(doc, sink, budget):
+                    pass
+                return len(sink.manifest) - written
+            budget.spend("pages", len(doc))
+        # Each job yields at most one image, so trimming the job list keeps
+        # the workers within the image limit.
+        images_left = budget.remaining("images")
+        truncated = images_left is not None and len(jobs) > images_left
+        if truncated:
+            jobs = jobs[:images_left]
+        # Workers can't share the budget, so they get its deadline instead.
+        deadline = None if budget.deadline is None else time.time() + budget.deadline - time.monotonic()
+        # Workers stage the images on disk next to where the sink keeps them
+        # (so adopting one is a rename) and the sink dedups by hash here.
+        # Whatever is not adopted, e.g. after the budget runs out, is
+        # removed with the staging folder. The pool is shared, so stopping
+        # early doesn't wait for the workers: queued chunks are cancelled
+        # and running ones stop at their next image once staging is gone.
+        chunks = _split_jobs(jobs, workers) if jobs else []
+        staging = tempfile.mkdtemp(dir=sink.staging_dir)
+        futures = deque()
+        entries = {}
+        try:
+            pool = get_pdf_pool()
+            futures.extend(pool.submit(_pdf_worker, in_memory_file, chunk, staging, deadline)
+                           for chunk in chunks)
+            while futures:
+                # Drop each future as soon as it is consumed.
+                for image_filename, source, staged, size, sha256 in futures.popleft().result():
+                    budget.spend("images")
+                    budget.spend("decompressed", size)
+                    entries[source] = sink.adopt(image_filename, staged, size, sha256, source)
+            _record_repeats(sink, repeats, entries)
+        finally:
+            # Renaming staging makes every later write in a worker fail;
+            # one already under way is removed when its worker finishes.
+            discarded = f"{staging}.discarded"
+            os.rename(staging, discarded)
+            shutil.rmtree(discarded, ignore_errors=True)
+            for future in futures:
+                if not future.cancel():
+                    future.add_done_callback(lambda _: shutil.rmtree(discarded, ignore_errors=True))
+        budget.check()
+        if truncated:
+            budget.stop("images")
+        return len(sink.manifest) - written
+    except BudgetExceeded:
+        return len(sink.manifest) - written
+    except Exception as e:
+        add_log("error", f"Error extracting images from PDF: {e}")
+        return len(sink.manifest) - written
+
+def iter_images_from_file(path, ext, output_folder, budget=None):
+    """
+    Per-member (.pptx, .docx) or per-page (.pdf) image extraction events
+    for a file on disk.
+    """
+    if ext == 'pptx':
+        return iter_images_from_zip(path, "ppt/media/", output_folder, budget=budget)
+    if ext == 'docx':
+        return iter_images_from_zip(path, "word/media/", output_folder, budget=budget)
+    if ext == 'pdf':
+        return iter_images_from_pdf(path, output_folder, budget=budget)
+    raise ValueError(f"Unsupported file extension: {ext}")
+
+def extract_images_from_file(path, ext, output_folder, budget=None):
+    """
+    Extract images from a .pptx, .docx or .pdf file on disk.
+    """
+    if ext == 'pptx':
+        return extract_images_from_zip(path, "ppt/media/", output_folder, budget=budget)
+    if ext == 'docx':
+        return extract_images_from_zip(path, "word/media/", output_folder, budget=budget)
+    if ext == 'pdf':
+        return extract_images_from_pdf(path, output_folder, budget=budget)
+    raise ValueError(f"Unsupported file extension: {ext}")
+
+# Office Open XML namespaces used by the document text extractors.
+OOXML_NS = {
+    "w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "p": "http://schemas.openxmlformats.org/presentationml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+    "v": "urn:schemas-microsoft-com:vml",
+    "cp": "http://schemas.openxmlformats.org/package/2006/metadata/core-properties",
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "dcterms": "http://purl.org/dc/terms/",
+}
+_W = "{%s}" % OOXML_NS["w"]
+_A = "{%s}" % OOXML_NS["a"]
+_R_EMBED = "{%s}embed" % OOXML_NS["r"]
+_R_ID = "{%s}id" % OOXML_NS["r"]
+_V_IMAGEDATA = "{%s}imagedata" % OOXML_NS["v"]
+
+# docProps/core.xml element -> metadata key, and the same for PDF metadata.
+OOXML_CORE_FIELDS = {
+    "dc:title": "title", "dc:creator": "author", "dc:subject": "subject",
+    "cp:keywords": "keywords", "dc:description": "description",
+    "dcterms:created": "created", "dcterms:modified": "modified",
+}
+PDF_METADATA_FIELDS = {
+    "title": "title", "author": "author", "subject": "subject", "keywords": "keywords",
+    "creationDate": "created", "modDate": "modified",
+}
+
+def _open_member(z, name, budget):
+    """
+    Open a package part, charging its declared (uncompressed) size first.
+    """
+    budget.spend("decompressed", z.getinfo(name).file_size)
+    return z.open(name)
+
+def _read_rels(z, rels_path, base_dir, budget):
+    """
+    Relationships of a package part: {id: (type, member path)}, with
+    targets resolved against base_dir and external links left out.
+    """
+    try:
+        with _open_member(z, rels_path, budget) as f:
+            root = ElementTree.parse(f).getroot()
+    except KeyError:
+        return {}
+    rels = {}
+    for rel in root.iter("{%s}Relationship" % OOXML_NS["rel"]):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target", "")
+        path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(base_dir, target))
+        rels[rel.get("Id")] = (rel.get("Type", ""), path)
+    return rels
+
+def _rels_path(part):
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, "_rels", name + ".rels")
+
+def _ooxml_metadata(z, budget):
+    try:
+        with _open_member(z, "docProps/core.xml", budget) as f:
+            root = ElementTree.parse(f).getroot()
+    except KeyError:
+        return {}
+    metadata = {}
+    for path, key in OOXML_CORE_FIELDS.items():
+        element = root.find(path, OOXML_NS)
+        if element is not None and element.text and element.text.strip():
+            metadata[key] = element.text.strip()
+    return metadata
+
+class _MediaWriter:
+    """
+    Writes package media into a sink the first time they are referenced,
+    decompressing each member once, in ZIP_CHUNK_SIZE pieces, and charging
+    it to the budget.
+    """
+    def __init__(self, z, media_folder, sink, budget):
+        self.z = z
+        self.sink = sink
+        self.budget = budget
+        self.media = {
+            info.filename: info for info in z.infolist()
+            if info.filename.startswith(media_folder) and not info.is_dir()
+        }
+        self.written = {}
+
+    def write(self, member):
+        if member in self.written or member not in self.media:
+            return self.written.get(member)
+        self.written[member] = None
+        self.budget.spend("images")
+        self.budget.spend("decompressed", self.media[member].file_size)
+        with self.z.open(self.media[member]) as src:
+            entry = self.sink.write(posixpath.basename(member), iter(lambda: src.read(ZIP_CHUNK_SIZE), b""),
+                                    source=member)
+        self.written[member] = entry["name"]
+        return entry["name"]
+
+    def leftovers(self):
+        """
+        Write the media no part referenced; return their names.
+        """
+        return [self.write(member) for member in self.media if member not in self.written]
+
+def _blip_ids(element):
+    ids = []
+    for node in element.iter():
+        if node.tag == _A + "blip" and node.get(_R_EMBED):
+            ids.append(node.get(_R_EMBED))
+        elif node.tag == _V_IMAGEDATA and node.get(_R_ID):
+            ids.append(node.get(_R_ID))
+    return ids
+
+def _iter_pdf_document(path, sink, budget):
+    with open_pdf(path) as doc:
+        metadata = {
+            key: doc.metadata[field] for field, key in PDF_METADATA_FIELDS.items()
+            if (doc.metadata or {}).get(field)
+        }
+        yield {"type": "document", "format": "pdf", "metadata": metadata, "units": len(doc)}
+        for event in _iter_pdf_pages(doc, sink, budget, text=True):
+            yield {"type": "page", "index": event["page"], "text": event["text"], "images": event["images"]}
+
+def _iter_docx_document(path, sink, budget):
+    with zipfile.ZipFile(path) as z:
+        main = "word/document.xml"
+        for rel_type, target in _read_rels(z, "_rels/.rels", "", budget).values():
+            if rel_type.endswith("/officeDocument"):
+                main = target
+        rels = _read_rels(z, _rels_path(main), posixpath.dirname(main), budget)
+        media = _MediaWriter(z, posixpath.dirname(main) + "/media/", sink, budget)
+        yield {"type": "document", "format": "docx", "metadata": _ooxml_metadata(z, budget), "units": None}
+        index = 0
+        with _open_member(z, main, budget) as f:
+            # Paragraphs are handled and cleared as they close, so only the
+            # current one is ever in memory. A nested paragraph (text box)
+            # is cleared before its outer one closes and isn't repeated.
+            for _, element in ElementTree.iterparse(f, events=("end",)):
+                if element.tag != _W + "p":
+                    continue
+                budget.check()
+                parts = []
+                for node in element.iter():
+                    if node.tag == _W + "t" and node.text:
+                        parts.append(node.text)
+                    elif node.tag == _W + "tab":
+                        parts.append("\t")
+                    elif node.tag in (_W + "br", _W + "cr"):
+                        parts.append("\n")
+                images = [media.write(rels[rid][1]) for rid in _blip_ids(element) if rid in rels]
+                images = [name for name in images if name]
+                text = "".join(parts).strip()
+                element.clear()
+                if text or images:
+                    index += 1
+                    yield {"type": "paragraph", "index": index, "text": text, "images": images}
+        leftovers = media.leftovers()
+        if leftovers:
+            yield {"type": "media", "index": None, "text": "", "images": leftovers}
+
+def _iter_pptx_document(path, sink, budget):
+    with zipfile.ZipFile(path) as z:
+        main = "ppt/presentation.xml"
+        for rel_type, target in _read_rels(z, "_rels/.rels", "", budget).values():
+            if rel_type.endswith("/officeDocument"):
+                main = target
+        rels = _read_rels(z, _rels_path(main), posixpath.dirname(main), budget)
+        with _open_member(z, main, budget) as f:
+            presentation = ElementTree.parse(f).getroot()
+        slides = [
+            rels[slide_id.get(_R_ID)][1]
+            for slide_id in presentation.iterfind("p:sldIdLst/p:sldId", OOXML_NS)
+            if slide_id.get(_R_ID) in rels
+        ]
+        media = _MediaWriter(z, posixpath.dirname(main) + "/media/", sink, budget)
+        yield {"type": "document", "format": "pptx", "metadata": _ooxml_metadata(z, budget), "units": len(slides)}
+        for index, slide in enumerate(slides, start=1):
+            budget.spend("pages")
+            slide_rels = _read_rels(z, _rels_path(slide), posixpath.dirname(slide), budget)
+            with _open_member(z, slide, budget) as f:
+                root = ElementTree.parse(f).getroot()
+            paragraphs = []
+            for paragraph in root.iter(_A + "p"):
+                text = "".join(
+                    node.text or "" if node.tag == _A + "t" else "\n"
+                    for node in paragraph.iter() if node.tag in (_A + "t", _A + "br")
+                ).strip()
+                if text:
+                    paragraphs.append(text)
+            images = [media.write(slide_rels[rid][1]) for rid in _blip_ids(root) if rid in slide_rels]
+            yield {"type": "slide", "index": index, "text": "\n".join(paragraphs),
+                   "images": [name for name in images if name]}
+        leftovers = media.leftovers()
+        if leftovers:
+            yield {"type": "media", "index": None, "text": "", "images": leftovers}
+
+DOCUMENT_READERS = {
+    "pdf": _iter_pdf_document,
+    "docx": _iter_docx_document,
+    "pptx": _iter_pptx_document,
+}
+
+def iter_document(path, ext, output_folder, budget=None):
+    """
+    Extract text and images from a .pdf, .docx or .pptx file in one pass,
+    opening and decompressing it once. Yields a {"type": "document",
+    "format", "metadata", "units"} event first, then one event per page,
+    paragraph (docx) or slide as soon as it is read: {"type", "index",
+    "text", "images"}, where images names what was written to the folder
+    or sink. Package media no part refers to arrive in a final "media"
+    event. Pages, slides, images and decompressed bytes are charged to
+    budget (a default Budget if None); when it runs out the events end
+    with a "partial" one (see budgeted).
+    """
+    if ext not in DOCUMENT_READERS:
+        raise ValueError(f"Unsupported file extension: {ext}")
+    budget = budget or Budget()
+    return budgeted(DOCUMENT_READERS[ext](path, as_sink(output_folder), budget), budget)
+
+def extract_document(path, ext, output_folder, budget=None):
+    """
+    iter_document collected into {"format", "metadata", "text", "units",
+    "image_count", "budget"}, where budget is the budget's report() and
+    says whether the whole document was read.
+    """
+    budget = budget or Budget()
+    result = {"format": ext, "metadata": {}}
+    units = []
+    for event in iter_document(path, ext, output_folder, budget):
+        if event["type"] == "document":
+            result.update(format=event["format"], metadata=event["metadata"])
+        elif event["type"] != "partial":
+            units.append(event)
+    result["units"] = units
+    result["text"] = "\n\n".join(unit["text"] for unit in units if unit["text"])
+    result["image_count"] = len({name for unit in units for name in unit["images"]})
+    result["budget"] = budget.report()
+    return result
+
+def extract_video_id(url):
+    """
+    Return the 11-character video ID from a YouTube URL (or a bare ID).
+    """
+    pattern = r"(?:v=|\/)([0-9A-Za-z_-]{11}).*"
+    match = re.search(pattern, url)
+    if match:
+        return match.group(1)
+    if re.fullmatch(r"[0-9A-Za-z_-]{11}", url.strip()):
+        return url.strip()
+    return None
+
+def _fetch_segments(video_id, languages, budget):
+    """
+    TRANSCRIPT_FETCHER.fetch limited to TRANSCRIPT_TIMEOUT seconds (or the
+    budget's deadline), enforced by the fetcher's own HTTP timeouts.
+    """
+    try:
+        return TRANSCRIPT_FETCHER.fetch(video_id, languages, timeout=budget.timeout(TRANSCRIPT_TIMEOUT))
+    except requests.Timeout:
+        budget.check()
+        raise TimeoutError(f"Fetching the transcript of {video_id} took over {TRANSCRIPT_TIMEOUT}s.")
+
+def fetch_transcript(video_url, languages=None, use_cache=True, budget=None):
+    """
+    Return the Transcript for a YouTube URL or video ID, served from the
+    transcript cache when possible. If budget (a default Budget if None)
+    runs out first, an empty Transcript is returned and not cached.
+    """
+    video_id = extract_video_id(video_url)
+    if not video_id:
+        raise ValueError("Invalid YouTube URL; cannot extract video ID.")
+    languages = tuple(languages or TRANSCRIPT_LANGUAGES)
+    key = f"{video_id}:{','.join(languages)}"
+    cache = get_transcript_cache() if use_cache else None
+    if cache is not None:
+        transcript = cache.get(key)
+        if transcript is not None:
+            return transcript
+    try:
+        transcript = Transcript.from_segments(_fetch_segments(video_id, languages, budget or Budget()))
+    except BudgetExceeded:
+        return Transcript.from_segments([])
+    if cache is not None:
+        cache.set(key, transcript)
+    return transcript
+
+def get_youtube_transcript_segments(video_url, languages=None, use_cache=True):
+    """
+    Return the transcript segments ({"text", "start", "duration"}) for a
+    YouTube URL or video ID.
+    """
+    return fetch_transcript(video_url, languages, use_cache).to_dicts()
+
+def fetch_youtube_transcripts(urls, languages=None, max_workers=None):
+    """
+    Fetch transcripts for many URLs or IDs. Duplicates are fetched once and
+    cache misses are fetched concurrently. Yields {"video_id", "segments"}
+    or {"video_id", "error"} per distinct video as each one completes;
+    inputs that are not YouTube URLs yield {"url", "error"}.
+    """
+    video_ids = []
+    for url in urls:
+        video_id = extract_video_id(url)
+        if video_id is None:
+            yield {"url": url, "error": "Invalid YouTube URL; cannot extract video ID."}
+        elif video_id not in video_ids:
+            video_ids.append(video_id)
+    if not video_ids:
+        return
+
+    def work(video_id):
+        try:
+            return {"video_id": video_id, "segments": get_youtube_transcript_segments(video_id, languages)}
+        except Exception as e:
+            return {"video_id": video_id, "error": str(e)}
+
+    pool = ThreadPoolExecutor(max_workers=min(max_workers or TRANSCRIPT_BATCH_WORKERS, len(video_ids)))
+    try:
+        futures = [pool.submit(work, video_id) for video_id in video_ids]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def get_youtube_transcript(video_url, budget=None):
+    """
+    Return transcript text from YouTube URL using youtube_transcript_api.
+    """
+    return fetch_transcript(video_url, budget=budget).text
+
+def fetch_article(url, use_cache=True, budget=None):
+    """
+    Scrape the article at a URL; returns the dict extract_article builds
+    ("text", "title", "byline", "published").
+    Results are cached by normalized URL. Fresh hits skip the network; stale
+    ones are revalidated with the stored ETag / Last-Modified so an
+    unchanged page costs a 304 instead of a download and parse.
+    The download is charged to budget (a default Budget if None). If it
+    runs out mid-page, the article is extracted from what arrived and not
+    cached; if it was already spent, the text is empty.
+    """
+    budget = budget or Budget()
+    cache = get_article_cache() if use_cache else None
+    key = cache_key(url)
+    cached = None
+    if cache is not None:
+        fresh = cache.get(key)
+        if fresh is not None:
+            return _article_fields(fresh)
+        cached = cache.get_stale(key)
+
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    try:
+        response = get_http_session().get(url, headers=headers, stream=True,
+                                          timeout=budget.timeout(ARTICLE_TIMEOUT))
+    except BudgetExceeded:
+        return _article_fields({"text": ""})
+    with response:
+        if cached and response.status_code == 304:
+            cache.set(key, cached)
+            return _article_fields(cached)
+        response.raise_for_status()
+        chunks = []
+        try:
+            for chunk in budget.metered(response_chunks(response)):
+                chunks.append(chunk)
+        except BudgetExceeded:
+            return extract_article(b"".join(chunks))
+    article = extract_article(b"".join(chunks))
+    if cache is not None:
+        cache.set(key, dict(article, etag=response.headers.get("ETag"),
+                            last_modified=response.headers.get("Last-Modified")))
+    return article
+
+def _article_fields(entry):
+    # Cache entries written before metadata was extracted only have "text".
+    return {field: entry.get(field) for field in ("title", "byline", "published", "text")}
+
+def scrape_article(url, use_cache=True, budget=None):
+    """
+    Scrape article text from a URL (see fetch_article).
+    """
+    return fetch_article(url, use_cache, budget)["text"]
+
+def scrape_articles(urls, max_workers=None, per_host=None, use_cache=True):
+    """
+    Scrape many articles concurrently, yielding one result dict per URL as
+    soon as it finishes (not in input order). Each dict carries the URL's
+    position in the input as "index", plus either "text" or "error".
+    At most per_host requests run against the same host at a time.
+    """
+    urls = list(urls)
+    if not urls:
+        return
+    limiter = HostLimiter(per_host or ARTICLE_BATCH_PER_HOST)
+
+    def work(index, url):
+        with limiter.slot(url):
+            try:
+                return {"index": index, "url": url, "text": scrape_article(url, use_cache=use_cache)}
+            except Exception as e:
+                return {"index": index, "url": url, "error": str(e)}
+
+    pool = ThreadPoolExecutor(max_workers=min(max_workers or ARTICLE_BATCH_WORKERS, len(urls)))
+    try:
+        futures = [pool.submit(work, index, url) for index, url in enumerate(urls)]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # A caller that stops reading leaves the unstarted URLs unfetched.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _small_image(head, min_width, min_height):
+    size = sniff_image_size(head)
+    return size is not None and (size[0] < min_width or size[1] < min_height)
+
+def _download_image(session, img_url, name, sink, limiter, timeout, max_bytes,
+                    min_width, min_height, budget):
+    """
+    Stream a single image into the sink, naming it name plus the extension
+    its Content-Type calls for. The response is abandoned, with its body
+    unread, when the headers say it is a text document or too large, or
+    when its first bytes show it is not an image in a known format (for
+    responses not typed image/*) or smaller than min_width x min_height.
+    Returns the manifest entry if the image was stored, else None; raises
+    BudgetExceeded when the budget runs out.
+    """
+    if budget.remaining("images") == 0:
+        budget.stop("images")
+    with limiter.slot(img_url):
+        try:
+            with session.get(img_url, timeout=budget.timeout(timeout), stream=True) as img_response:
+                img_response.raise_for_status()
+                content_type = img_response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+                if content_type.startswith(("text/", "application/json", "application/xhtml")):
+                    return None
+                chunks = budget.metered(response_chunks(img_response, max_bytes=max_bytes))
+                head, chunks = peek_chunks(chunks, IMAGE_SNIFF_BYTES)
+                if not content_type.startswith("image/") and sniff_image_extension(head) is None:
+                    return None
+                if _small_image(head, min_width, min_height):
+                    return None
+                budget.spend("images")
+                return sink.write(name + image_extension(content_type, img_url, head), chunks,
+                                  source=img_url, max_bytes=max_bytes)
+        except BudgetExceeded:
+            raise
+        except Exception:
+            return None
 
-  <!-- LOGS TAB -->
-  <div id="tab-logs" class="tab-content">
-    <h2>All Logs</h2>
-    <div class="logs">
-      {% for log in logs %}
-        <div class="log-entry">
-          <span class="log-type">[{{ log.type|upper }}]</span>
-          <span class="log-message">{{ log.message }}</span>
-        </div>
-      {% endfor %}
-    </div>
-  </div>
-</div>
+def _store_data_uri(uri, name, sink, max_bytes, min_width, min_height, budget):
+    """
+    Decode an inline data: image straight into the sink. Returns True if it
+    was stored.
+    """
+    try:
+        content_type, data = decode_data_uri(uri)
+    except ValueError:
+        return False
+    if not content_type.startswith("image/") or (max_bytes is not None and len(data) > max_bytes):
+        return False
+    if _small_image(data[:IMAGE_SNIFF_BYTES], min_width, min_height):
+        return False
+    budget.spend("images")
+    sink.write(name + image_extension(content_type, "", data[:16]), [data], source=uri[:64], max_bytes=max_bytes)
+    return True
 
-<script>
-  function switchTab(tabId){
-    const tabs = document.querySelectorAll('.tab-content');
-    tabs.forEach(t => t.classList.remove('active'));
+def download_images(image_tags, base_url, output_folder, max_workers=None, per_host=None,
+                    timeout=None, max_bytes=IMAGE_MAX_BYTES, min_width=None, min_height=None,
+                    target_width=None, limiter=None, prefix="image_", budget=None):
+    """
+    Download the images behind parsed <img> tags (see parse_image_tags)
+    into a folder or sink and return how many of the tags had their image
+    stored. Each <img> is first resolved to a single candidate (see
+    image_candidate); tags declaring a size under min_width x min_height
+    and non-image responses are skipped, and data: URIs are decoded
+    without any request. A URL used by several tags is downloaded and
+    stored once; the other tags get manifest entries pointing at it, and
+    each tag counts. The rest are downloaded concurrently over a shared, keep-alive session; max_workers bounds the total number of
+    downloads in flight and per_host (or a shared limiter) bounds how many
+    of them may hit the same host. Each image is streamed to the output in
+    chunks and skipped if it is larger than max_bytes. Files are named
+    prefix plus the tag's position on the page. Downloads and images are
+    charged to budget (a default Budget if None); once it runs out the
+    remaining downloads stop and the images stored so far are counted.
+    """
+    budget = budget or Budget()
+    max_workers = max_workers or IMAGE_DOWNLOAD_WORKERS
+    timeout = timeout or IMAGE_DOWNLOAD_TIMEOUT
+    min_width = IMAGE_MIN_WIDTH if min_width is None else min_width
+    min_height = IMAGE_MIN_HEIGHT if min_height is None else min_height
+    limiter = limiter or HostLimiter(per_host or IMAGE_DOWNLOAD_PER_HOST)
+    sink = as_sink(output_folder)
+    session = get_http_session()
 
-    const buttons = document.querySelectorAll('.tabs button');
-    buttons.forEach(b => b.classList.remove('active'));
+    downloaded_count = 0
+    jobs = []
+    seen = set()
+    # (name, URL, URL) for each tag using a URL an earlier tag already did.
+    repeats = []
+    try:
+        for i, img in enumerate(image_tags):
+            img_url = image_candidate(img, target_width)
+            if not img_url or declared_too_small(img, min_width, min_height):
+                continue
+            if img_url.startswith("data:"):
+                if _store_data_uri(img_url, f"{prefix}{i}", sink, max_bytes, min_width, min_height, budget):
+                    downloaded_count += 1
+                continue
+            img_url = requests.compat.urljoin(base_url, img_url)
+            if img_url in seen:
+                repeats.append((f"{prefix}{i}", img_url, img_url))
+                continue
+            seen.add(img_url)
+            jobs.append((img_url, f"{prefix}{i}"))
+    except BudgetExceeded:
+        return downloaded_count
+    if not jobs:
+        return downloaded_count
 
-    document.getElementById(tabId).classList.add('active');
-    const btn = Array.from(buttons).find(b => b.textContent.trim() === document.getElementById(tabId).querySelector('h2').textContent.trim());
-    if(btn){
-      btn.classList.add('active');
-    }
-  }
-</script>
-</body>
-</html>
-"""
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as pool:
+        futures = [
+            pool.submit(_download_image, session, img_url, name, sink, limiter, timeout, max_bytes,
+                        min_width, min_height, budget)
+            for img_url, name in jobs
+        ]
+        entries = {}
+        for future, (img_url, _) in zip(futures, jobs):
+            try:
+                entry = future.result()
+            except BudgetExceeded:
+                continue
+            if entry is not None:
+                entries[img_url] = entry
+                downloaded_count += 1
+    return downloaded_count + len(_record_repeats(sink, repeats, entries))
+
+def scrape_images(url, output_folder="images", max_workers=None, per_host=None, timeout=None,
+                  max_bytes=IMAGE_MAX_BYTES, min_width=None, min_height=None, target_width=None,
+                  budget=None):
+    """
+    Scrape images from a given URL into a folder or sink; see
+    download_images for how they are picked and fetched. The page and the
+    images share budget (a default Budget if None); 0 is returned if it
+    runs out before the page is in.
+    """
+    budget = budget or Budget()
+    session = get_http_session()
+    try:
+        with session.get(url, timeout=budget.timeout(timeout or IMAGE_DOWNLOAD_TIMEOUT), stream=True) as response:
+            response.raise_for_status()
+            content = b"".join(budget.metered(response_chunks(response)))
+    except BudgetExceeded:
+        return 0
+    return download_images(parse_image_tags(content), response.url or url, output_folder,
+                           max_workers=max_workers, per_host=per_host, timeout=timeout,
+                           max_bytes=max_bytes, min_width=min_width, min_height=min_height,
+                           target_width=target_width, budget=budget)
 
 ################################################################################
-#  FUNCTIONS
-#  1) Extract images from PPTX / DOCX / PDF
-#  2) YouTube transcript
-#  3) Article scraping
-#  4) Internet images scraping
+#  CRAWLING
+#  crawl() walks a site breadth-first from a start URL, fetching every page
+#  once and running the article and/or image extraction on it. The frontier
+#  never holds more URLs than are left to crawl, the seen-set switches to a
+#  Bloom filter for large crawls, and robots.txt (including Crawl-delay) is
+#  fetched once per host and honoured.
 ################################################################################
+CRAWL_MAX_PAGES = 100
+CRAWL_MAX_DEPTH = 2
+# Links followed from any single page.
+CRAWL_MAX_LINKS_PER_PAGE = 200
+CRAWL_WORKERS = 8
+CRAWL_PER_HOST = 4
+CRAWL_TIMEOUT = 15
+# Crawls allowed more pages than this track seen URLs in a Bloom filter,
+# sized for this many links per page at CRAWL_BLOOM_ERROR_RATE.
+CRAWL_SET_MAX_PAGES = 2000
+CRAWL_BLOOM_LINKS_PER_PAGE = 50
+CRAWL_BLOOM_ERROR_RATE = 0.001
+CRAWL_MODES = ("article", "images", "both")
+# Largest crawl the web API accepts.
+CRAWL_API_MAX_PAGES = 10000
+# Largest crawl the web API answers with a single JSON document; bigger
+# ones run as a background job unless the client streams NDJSON.
+CRAWL_API_SYNC_MAX_PAGES = 100
+# A crawl's budget allows this many seconds per page (but no less than an
+# interactive request and no more than CRAWL_BUDGET_MAX_SECONDS), and more
+# bytes and images than a single page would.
+CRAWL_BUDGET_SECONDS_PER_PAGE = float(os.environ.get("CRAWL_BUDGET_SECONDS_PER_PAGE", "2"))
+CRAWL_BUDGET_MAX_SECONDS = float(os.environ.get("CRAWL_BUDGET_MAX_SECONDS", str(6 * 3600))) or None
+CRAWL_BUDGET_MAX_BYTES = int(os.environ.get("CRAWL_BUDGET_MAX_BYTES", str(16 * 1024 * 1024 * 1024))) or None
+CRAWL_BUDGET_MAX_IMAGES = int(os.environ.get("CRAWL_BUDGET_MAX_IMAGES", "200000")) or None
 
-def extract_images_from_zip(in_memory_file, media_folder, output_folder):
+def crawl_budget(max_pages):
     """
-    Extract images from a zipped office file (pptx/docx).
+    Budget sized for a crawl of up to max_pages pages.
     """
-    with zipfile.ZipFile(in_memory_file, "r") as z:
-        media_files = [f for f in z.namelist() if f.startswith(media_folder) and not f.endswith('/')]
-        extracted_count = 0
-        for file in media_files:
-            data = z.read(file)
-            filename = os.path.basename(file)
-            out_path = os.path.join(output_folder, filename)
-            with open(out_path, "wb") as f_out:
-                f_out.write(data)
-            extracted_count += 1
-        return extracted_count
-
-def extract_images_from_pdf(in_memory_file, output_folder):
+    seconds = max(BUDGET_SECONDS or 0, CRAWL_BUDGET_SECONDS_PER_PAGE * max_pages)
+    if CRAWL_BUDGET_MAX_SECONDS:
+        seconds = min(seconds, CRAWL_BUDGET_MAX_SECONDS)
+    return Budget(seconds=seconds or None, max_bytes=CRAWL_BUDGET_MAX_BYTES,
+                  max_images=CRAWL_BUDGET_MAX_IMAGES, max_pages=max_pages)
+
+class BloomFilter:
     """
-    Extract images from PDF using PyMuPDF.
+    Fixed-size probabilistic set: membership tests may return false
+    positives (at about error_rate once capacity items are in) but never
+    false negatives. Supports add() and the in operator like a set.
     """
-    extracted_count = 0
+    def __init__(self, capacity, error_rate=CRAWL_BLOOM_ERROR_RATE):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+class RobotsCache:
+    """
+    robots.txt rules per host, fetched on first use, plus Crawl-delay
+    pacing: wait(url) blocks until the host's delay since the previous
+    request has passed. The fetches are charged to the crawl's budget; one
+    that runs it out raises BudgetExceeded and is tried again next time.
+    """
+    def __init__(self, session, user_agent, timeout, budget):
+        self.session = session
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._parsers = {}
+        self._next_request = {}
+
+    def _parser(self, url):
+        parts = urlparse(url)
+        origin = f"{parts.scheme}://{parts.netloc}".lower()
+        with self._lock:
+            parser = self._parsers.get(origin)
+        if parser is not None:
+            return parser
+        parser = RobotFileParser(origin + "/robots.txt")
+        try:
+            with self.session.get(origin + "/robots.txt", timeout=self.budget.timeout(self.timeout),
+                                  stream=True) as response:
+                if response.status_code in (401, 403):
+                    parser.disallow_all = True
+                elif response.ok:
+                    body = b"".join(self.budget.metered(response_chunks(response)))
+                    parser.parse(body.decode("utf-8", errors="replace").splitlines())
+                else:
+                    parser.allow_all = True
+        except requests.RequestException:
+            parser.allow_all = True
+        with self._lock:
+            return self._parsers.setdefault(origin, parser)
+
+    def allowed(self, url):
+        return self._parser(url).can_fetch(self.user_agent, url)
+
+    def wait(self, url):
+        delay = self._parser(url).crawl_delay(self.user_agent)
+        if not delay:
+            return
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_request.get(host, now))
+            self._next_request[host] = start + float(delay)
+        if start > now:
+            time.sleep(start - now)
+
+def crawl(start_url, mode="article", output_folder=None, max_pages=None, max_depth=None,
+          same_domain=True, scope=None, max_links_per_page=None, max_workers=None,
+          per_host=None, respect_robots=True, timeout=None, budget=None):
+    """
+    Crawl breadth-first from start_url and yield one result dict per page,
+    in completion order: {"url", "depth", "page"} plus the fields of
+    extract_article (mode "article" or "both"), "images" (the number stored into output_folder,
+    mode "images" or "both"), or "error".
+
+    At most max_pages pages are fetched, none deeper than max_depth links
+    from the start. Links are followed only on the start URL's host when
+    same_domain is set, and only below the scope URL prefix when given.
+    max_workers pages are fetched at once, at most per_host of them from
+    the same host.
+
+    Pages, page and image downloads and images all count against budget
+    (a default Budget if None). When it runs out no new pages are started
+    and the results end with a {"type": "partial", ...budget.report()}
+    record.
+    """
+    if mode not in CRAWL_MODES:
+        raise ValueError(f"Unknown crawl mode: {mode}")
+    budget = budget or Budget()
+    max_pages = max_pages or CRAWL_MAX_PAGES
+    max_depth = CRAWL_MAX_DEPTH if max_depth is None else max_depth
+    max_links_per_page = max_links_per_page or CRAWL_MAX_LINKS_PER_PAGE
+    max_workers = max_workers or CRAWL_WORKERS
+    timeout = timeout or CRAWL_TIMEOUT
+    want_text = mode in ("article", "both")
+    sink = as_sink(output_folder or "images") if mode in ("images", "both") else None
+
+    session = get_http_session()
+    user_agent = session.headers.get("User-Agent", "*")
+    robots = RobotsCache(session, user_agent, timeout, budget) if respect_robots else None
+    limiter = HostLimiter(per_host or CRAWL_PER_HOST)
+    image_limiter = HostLimiter(IMAGE_DOWNLOAD_PER_HOST)
+    start_host = urlparse(start_url).netloc.lower()
+
+    def in_scope(url):
+        parts = urlparse(url)
+        if parts.scheme not in ("http", "https"):
+            return False
+        if same_domain and parts.netloc.lower() != start_host:
+            return False
+        return scope is None or url.startswith(scope)
+
+    def fetch_page(url, depth, page):
+        result = {"url": url, "depth": depth, "page": page}
+        links = []
+        try:
+            budget.spend("pages")
+            if robots is not None:
+                robots.wait(url)
+            with limiter.slot(url):
+                with session.get(url, timeout=budget.timeout(timeout), stream=True) as response:
+                    response.raise_for_status()
+                    content_type = response.headers.get("Content-Type", "text/html").lower()
+                    if "html" not in content_type:
+                        result["error"] = f"Not an HTML page ({content_type.split(';')[0]})."
+                        return result, links
+                    content = b"".join(budget.metered(response_chunks(response)))
+            if want_text:
+                result.update(extract_article(content))
+            if sink is not None:
+                result["images"] = download_images(parse_image_tags(content), response.url, sink,
+                                                   limiter=image_limiter, prefix=f"page{page}_image_",
+                                                   budget=budget)
+            if depth < max_depth:
+                links = [
+                    requests.compat.urljoin(response.url, href)
+                    for href in islice(parse_links(content), max_links_per_page)
+                ]
+        except BudgetExceeded:
+            # Never fetched, or cut off mid-download: no result for this page.
+            return None, []
+        except Exception as e:
+            result["error"] = str(e)
+        return result, links
+
+    try:
+        disallowed = robots is not None and not robots.allowed(start_url)
+    except BudgetExceeded:
+        yield dict(budget.report(), type="partial")
+        return
+    if disallowed:
+        yield {"url": start_url, "depth": 0, "page": 0, "error": "Disallowed by robots.txt."}
+        return
+    if max_pages > CRAWL_SET_MAX_PAGES:
+        seen = BloomFilter(max_pages * CRAWL_BLOOM_LINKS_PER_PAGE)
+    else:
+        seen = set()
+    seen.add(normalize_url(start_url))
+    frontier = deque([(start_url, 0)])
+    scheduled = 1
+    started = 0
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    in_flight = {}
     try:
-        with fitz.open(stream=in_memory_file.read(), filetype="pdf") as doc:
-            for page_index in range(len(doc)):
-                page = doc[page_index]
-                image_list = page.get_images(full=True)
-                for img_index, img in enumerate(image_list):
-                    xref = img[0]
-                    base_image = doc.extract_image(xref)
-                    if not base_image:
+        while frontier or in_flight:
+            while frontier and len(in_flight) < max_workers:
+                url, depth = frontier.popleft()
+                in_flight[pool.submit(fetch_page, url, depth, started)] = depth
+                started += 1
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                depth = in_flight.pop(future)
+                result, links = future.result()
+                if not budget.complete:
+                    # Let the pages in flight wind down, but start no more.
+                    frontier.clear()
+                    links = []
+                for link in links:
+                    if scheduled >= max_pages:
+                        break
+                    key = normalize_url(link)
+                    if key in seen or not in_scope(link):
                         continue
-                    image_bytes = base_image.get("image")
-                    image_ext = base_image.get("ext", "png")
-                    image_filename = f"page{page_index+1}_{img_index}.{image_ext}"
-                    out_path = os.path.join(output_folder, image_filename)
-                    with open(out_path, "wb") as f_out:
-                        f_out.write(image_bytes)
-                    extracted_count += 1
-        return extracted_count
-    except Exception as e:
-        return 0
+                    seen.add(key)
+                    try:
+                        if robots is not None and not robots.allowed(link):
+                            continue
+                    except BudgetExceeded:
+                        frontier.clear()
+                        break
+                    frontier.append((link, depth + 1))
+                    scheduled += 1
+                if result is not None:
+                    yield result
+        if not budget.complete:
+            yield dict(budget.report(), type="partial")
+    finally:
+        # Closing the crawl early cancels the pages not yet started.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+################################################################################
+#  BACKGROUND JOBS
+#  Long-running work can be handed to an in-process worker pool. Job state
+#  lives in a pluggable store: in memory (default) or in a SQLite file, set
+#  with the JOB_BACKEND / JOB_DB_PATH environment variables.
+################################################################################
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+JOB_BACKEND = os.environ.get("JOB_BACKEND", "memory")
+JOB_DB_PATH = os.environ.get("JOB_DB_PATH", "jobs.sqlite3")
+# Finished jobs are purged when a new job is submitted once they are older
+# than JOB_TTL seconds, or beyond the newest JOB_MAX_FINISHED of them.
+JOB_TTL = int(os.environ.get("JOB_TTL", str(24 * 3600)))
+JOB_MAX_FINISHED = int(os.environ.get("JOB_MAX_FINISHED", "1000"))
+JOB_FINISHED_STATUSES = ("done", "error", "cancelled")
+# Jobs run unattended, so their default budget is larger than an
+# interactive request's (see BUDGETS).
+JOB_BUDGET_SECONDS = float(os.environ.get("JOB_BUDGET_SECONDS", "3600")) or None
+JOB_BUDGET_MAX_BYTES = int(os.environ.get("JOB_BUDGET_MAX_BYTES", str(4 * 1024 * 1024 * 1024))) or None
+JOB_BUDGET_MAX_DECOMPRESSED = int(os.environ.get("JOB_BUDGET_MAX_DECOMPRESSED",
+                                                 str(8 * 1024 * 1024 * 1024))) or None
 
-def get_youtube_transcript(video_url):
+def job_budget():
     """
-    Return transcript text from YouTube URL using youtube_transcript_api.
+    Budget for a background job that does not need a bigger one.
     """
-    def extract_video_id(url):
-        pattern = r"(?:v=|\/)([0-9A-Za-z_-]{11}).*"
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-        return None
+    return Budget(seconds=JOB_BUDGET_SECONDS, max_bytes=JOB_BUDGET_MAX_BYTES,
+                  max_decompressed=JOB_BUDGET_MAX_DECOMPRESSED)
 
-    video_id = extract_video_id(video_url)
-    if not video_id:
-        raise ValueError("Invalid YouTube URL; cannot extract video ID.")
-    transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-    transcript_text = "\n".join(seg.get('text', '') for seg in transcript_list)
-    return transcript_text
+class MemoryJobStore:
+    """
+    Keep job records in a dict. Records are lost on restart.
+    """
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
 
-def scrape_article(url):
+    def create(self, job_id, kind):
+        with self._lock:
+            self._jobs[job_id] = {
+                "id": job_id, "kind": kind, "status": "queued",
+                "created": time.time(), "started": None, "finished": None,
+                "result": None, "error": None,
+            }
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def purge(self, finished_before, keep):
+        """
+        Drop finished jobs older than finished_before and all but the
+        newest keep finished jobs; returns how many were dropped.
+        """
+        with self._lock:
+            finished = sorted(
+                (job for job in self._jobs.values() if job["status"] in JOB_FINISHED_STATUSES),
+                key=lambda job: job["finished"] or 0, reverse=True,
+            )
+            expired = [job["id"] for n, job in enumerate(finished)
+                       if n >= keep or (job["finished"] or 0) < finished_before]
+            for job_id in expired:
+                del self._jobs[job_id]
+            return len(expired)
+
+class SqliteJobStore:
     """
-    Scrape article text from a URL, preferring <article> tag, else <p> tags.
+    Keep job records in a SQLite database so status and results survive a
+    restart. Jobs that were queued or running when the process stopped are
+    marked as failed on startup, since their work cannot be resumed.
     """
-    headers = {
-        'User-Agent': (
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-            'AppleWebKit/537.36 (KHTML, like Gecko) '
-            'Chrome/115.0.0.0 Safari/537.36'
-        )
-    }
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    soup = BeautifulSoup(response.content, 'html.parser')
-    article_tag = soup.find('article')
-    if article_tag:
-        return article_tag.get_text(separator='\n', strip=True)
-    else:
-        paragraphs = soup.find_all('p')
-        return "\n".join(p.get_text(strip=True) for p in paragraphs)
+    COLUMNS = ("id", "kind", "status", "created", "started", "finished", "result", "error")
+
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT, status TEXT, created REAL, "
+                "started REAL, finished REAL, result TEXT, error TEXT)"
+            )
+            self._conn.execute(
+                "UPDATE jobs SET status = 'error', error = 'Interrupted by restart.' "
+                "WHERE status IN ('queued', 'running')"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished)")
 
-def scrape_images(url, output_folder="images"):
+    def create(self, job_id, kind):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, created) VALUES (?, ?, 'queued', ?)",
+                (job_id, kind, time.time()),
+            )
+
+    def update(self, job_id, **fields):
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        assignments = ", ".join(f"{name} = ?" for name in fields if name in self.COLUMNS)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                [fields[name] for name in fields if name in self.COLUMNS] + [job_id],
+            )
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(self.COLUMNS, row))
+        if job["result"] is not None:
+            job["result"] = json.loads(job["result"])
+        return job
+
+    def purge(self, finished_before, keep):
+        """
+        Delete finished jobs older than finished_before and all but the
+        newest keep finished jobs; returns how many were deleted.
+        """
+        statuses = ", ".join("?" * len(JOB_FINISHED_STATUSES))
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({statuses}) AND (finished < ? OR id IN ("
+                f"SELECT id FROM jobs WHERE status IN ({statuses}) ORDER BY finished DESC LIMIT -1 OFFSET ?))",
+                (*JOB_FINISHED_STATUSES, finished_before, *JOB_FINISHED_STATUSES, keep),
+            )
+            return cursor.rowcount
+
+class JobQueue:
     """
-    Scrape images from a given URL.
+    Run submitted callables on a thread pool and record their progress and
+    results in a job store. Each job runs under its own Budget (given to
+    submit, job_budget() by default), passed to func as budget=; cancel()
+    stops the job through it, and the job then finishes as "cancelled" with
+    whatever partial result func returns. Dict results get the budget's
+    report and "truncated": true when a limit cut the work short. A job's
+    cleanup() runs once it ends, even if it was cancelled before it ran.
     """
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
+    def __init__(self, store, workers=JOB_WORKERS):
+        self.store = store
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._budgets = {}
+        self._lock = threading.Lock()
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                      "AppleWebKit/537.36 (KHTML, like Gecko) "
-                      "Chrome/115.0.0.0 Safari/537.36"
-    }
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    soup = BeautifulSoup(response.text, "html.parser")
-    image_tags = soup.find_all("img")
-    downloaded_count = 0
-    for i, img in enumerate(image_tags):
-        img_url = img.get("src")
-        if not img_url:
-            continue
-        img_url = requests.compat.urljoin(url, img_url)
+    def submit(self, kind, func, *args, job_id=None, budget=None, cleanup=None, **kwargs):
+        self.purge()
+        job_id = job_id or uuid.uuid4().hex
+        budget = budget or job_budget()
+        with self._lock:
+            self._budgets[job_id] = budget
+        self.store.create(job_id, kind)
+        self._pool.submit(self._run, job_id, kind, func, args, dict(kwargs, budget=budget), cleanup)
+        return job_id
+
+    def cancel(self, job_id):
+        """
+        Ask a queued or running job to stop; False if it is not one.
+        """
+        with self._lock:
+            budget = self._budgets.get(job_id)
+        if budget is None:
+            return False
+        budget.cancel()
+        return True
+
+    def purge(self):
+        """
+        Evict finished jobs past JOB_TTL or beyond JOB_MAX_FINISHED.
+        """
+        purged = self.store.purge(time.time() - JOB_TTL, JOB_MAX_FINISHED)
+        if purged:
+            add_log("info", f"Purged {purged} finished jobs.")
+        return purged
+
+    def _run(self, job_id, kind, func, args, kwargs, cleanup=None):
+        budget = kwargs["budget"]
         try:
-            img_response = requests.get(img_url, headers=headers)
-            img_response.raise_for_status()
-        except Exception:
-            continue
-        ext = os.path.splitext(img_url)[1]
-        if not ext or len(ext) > 5:
-            ext = ".jpg"
-        image_path = os.path.join(output_folder, f"image_{i}{ext}")
-        with open(image_path, "wb") as f:
-            f.write(img_response.content)
-        downloaded_count += 1
-    return downloaded_count
+            if budget.stopped_by == "cancelled":
+                self.store.update(job_id, status="cancelled", finished=time.time())
+                return
+            self.store.update(job_id, status="running", started=time.time())
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                add_log("error", f"Job {job_id} ({kind}) failed: {e}")
+                self.store.update(job_id, status="error", error=str(e), finished=time.time())
+            else:
+                if isinstance(result, dict):
+                    result["budget"] = budget.report()
+                    result["truncated"] = not budget.complete
+                status = "cancelled" if budget.stopped_by == "cancelled" else "done"
+                self.store.update(job_id, status=status, result=result, finished=time.time())
+        finally:
+            with self._lock:
+                self._budgets.pop(job_id, None)
+            if cleanup is not None:
+                cleanup()
+
+_JOB_QUEUE = None
+_JOB_QUEUE_LOCK = threading.Lock()
+
+def get_job_queue():
+    """
+    The JobQueue, with its jobs kept in the store JOB_BACKEND selects.
+    """
+    global _JOB_QUEUE
+    with _JOB_QUEUE_LOCK:
+        if _JOB_QUEUE is None:
+            if JOB_BACKEND == "sqlite":
+                store = SqliteJobStore(JOB_DB_PATH)
+            else:
+                store = MemoryJobStore()
+            _JOB_QUEUE = JobQueue(store)
+        return _JOB_QUEUE
+
+def duplicates_note(sink):
+    """
+    Suffix for status messages mentioning skipped duplicate images.
+    """
+    if not sink.duplicate_count:
+        return ""
+    return f" Skipped {sink.duplicate_count} duplicates."
+
+def budget_note(budget):
+    """
+    Suffix for status messages when a budget cut the work short.
+    """
+    if budget.complete:
+        return ""
+    if budget.stopped_by == "cancelled":
+        return " Cancelled; results are partial."
+    return f" Stopped early at the {budget.stopped_by} limit; results are partial."
+
+def new_image_sink(job_id=None):
+    """
+    StoreSink for a web request or job; returns (job_id, sink).
+    """
+    job_id = job_id or uuid.uuid4().hex
+    return job_id, StoreSink(get_image_store(), job_id, dedup=IMAGE_DEDUP)
+
+def _extract_images_job(path, ext, job_id, budget):
+    start = time.perf_counter()
+    job_id, sink = new_image_sink(job_id)
+    extracted_count = extract_images_from_file(path, ext, sink, budget=budget)
+    add_log("info", f"Extracted {extracted_count} images from {ext.upper()}."
+                    f"{duplicates_note(sink)}{budget_note(budget)}",
+            duration=time.perf_counter() - start)
+    return {"extracted_count": extracted_count, "stored_count": sink.stored_count,
+            "manifest": sink.manifest, "budget": budget.report()}
+
+def _youtube_transcript_job(url, budget):
+    start = time.perf_counter()
+    transcript_text = get_youtube_transcript(url, budget=budget)
+    add_log("info", f"Fetched transcript from YouTube URL: {url}{budget_note(budget)}",
+            duration=time.perf_counter() - start)
+    return {"transcript": transcript_text, "budget": budget.report()}
+
+def _article_job(url, budget):
+    start = time.perf_counter()
+    text = scrape_article(url, budget=budget)
+    add_log("info", f"Scraped article from URL: {url}{budget_note(budget)}", duration=time.perf_counter() - start)
+    return {"text": text, "budget": budget.report()}
+
+def _internet_images_job(url, job_id, budget):
+    start = time.perf_counter()
+    job_id, sink = new_image_sink(job_id)
+    downloaded_count = scrape_images(url, output_folder=sink, budget=budget)
+    add_log("info", f"Scraped {downloaded_count} images from {url} (job {job_id})."
+                    f"{duplicates_note(sink)}{budget_note(budget)}",
+            duration=time.perf_counter() - start)
+    return {"downloaded_count": downloaded_count, "stored_count": sink.stored_count,
+            "manifest": sink.manifest, "budget": budget.report()}
+
+def _crawl_job(url, job_id, budget, **options):
+    start = time.perf_counter()
+    sink = new_image_sink(job_id)[1] if options["mode"] != "article" else None
+    items = list(crawl(url, output_folder=sink, budget=budget, **options))
+    pages = sum(1 for item in items if item.get("type") != "partial")
+    add_log("info", f"Crawled {pages} pages from {url} (job {job_id}).{budget_note(budget)}",
+            duration=time.perf_counter() - start)
+    return {"url": url, "items": items, "budget": budget.report()}
+
+def _zip_extracted(path, ext):
+    """
+    ZIP producer for an uploaded file saved at path. The caller removes the
+    file (see zip_download's cleanup).
+    """
+    def produce(sink):
+        start = time.perf_counter()
+        budget = Budget()
+        count = extract_images_from_file(path, ext, sink, budget=budget)
+        add_log("info", f"Streamed {count} images from {ext.upper()} as ZIP."
+                        f"{duplicates_note(sink)}{budget_note(budget)}",
+                duration=time.perf_counter() - start)
+    return produce
+
+def _zip_scraped(url):
+    """
+    ZIP producer for the images on a web page.
+    """
+    def produce(sink):
+        start = time.perf_counter()
+        budget = Budget()
+        count = scrape_images(url, output_folder=sink, budget=budget)
+        add_log("info", f"Streamed {count} images from {url} as ZIP."
+                        f"{duplicates_note(sink)}{budget_note(budget)}",
+                duration=time.perf_counter() - start)
+    return produce
+
+def wants_async():
+    """
+    True when the client asked for the work to run as a background job.
+    """
+    return request.values.get("async", "").lower() in ("1", "true", "yes")
+
+def wants_zip(value=None):
+    """
+    True when the client asked for the images as a ZIP download, with
+    download=zip or Accept: application/zip.
+    """
+    value = request.values.get("download", "") if value is None else value
+    return value.lower() == "zip" or request.accept_mimetypes.best == "application/zip"
+
+def zip_download(produce, filename, concurrent=False, cleanup=None):
+    """
+    Response streaming the ZIP archive that produce(sink) builds (see
+    stream_zip). cleanup, e.g. removing the upload, is hooked to the
+    response's close.
+    """
+    filename = re.sub(r"[^\w.-]", "_", filename)
+    response = Response(
+        stream_zip(produce, dedup=IMAGE_DEDUP, concurrent=concurrent),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+    if cleanup is not None:
+        response.call_on_close(cleanup)
+    return response
+
+def job_accepted(job_id):
+    """
+    Response returned when a job has been queued.
+    """
+    return jsonify({
+        "job_id": job_id,
+        "status_url": url_for("job_status", job_id=job_id),
+        "result_url": url_for("job_result", job_id=job_id),
+    }), 202
 
 @app.route("/", methods=["GET"])
 def index():
     """
     Render the main HTML page, along with any dynamic content we might have.
     """
-    return render_template_string(
-        HTML_TEMPLATE,
-        logs=ALL_LOGS,
-        file_extract_status=None,
-        youtube_status=None,
-        youtube_transcript=None,
-        article_status=None,
-        article_text=None,
-        webpics_status=None,
-    )
+    return render_page()
+
+@app.route("/assets/<name>", methods=["GET"])
+def asset(name):
+    """
+    Serve the page's CSS/JS with an ETag and Cache-Control so browsers keep
+    them between page loads.
+    """
+    if name not in ASSETS:
+        return jsonify({"error": "Unknown asset."}), 404
+    body, mimetype = ASSETS[name]
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(hashlib.sha1(body.encode("utf-8")).hexdigest())
+    response.cache_control.public = True
+    response.cache_control.max_age = ASSET_MAX_AGE
+    return response.make_conditional(request)
 
 @app.route("/extract_images", methods=["POST"])
 def extract_images():
@@ -437,83 +4138,60 @@ def extract_images():
     Handle uploading a file (.pdf, .pptx, .docx) and extracting its images.
     """
     if 'file' not in request.files:
-        add_log("error", "No file part in request.")
-        return redirect(url_for("index"))
+        return missing_input("No file part in request.")
 
     file = request.files['file']
     if file.filename == '':
-        add_log("error", "No selected file.")
-        return redirect(url_for("index"))
+        return missing_input("No selected file.")
 
     filename = file.filename.lower()
     _, ext = os.path.splitext(filename)
     ext = ext.lstrip('.')
 
-    # Temporary folder to store images
-    output_folder = "extracted_images"
-    os.makedirs(output_folder, exist_ok=True)
+    if ext not in SUPPORTED_UPLOADS:
+        add_log("error", f"Unsupported file extension: {ext}")
+        return render_page(status=400, file_extract_status="Unsupported file extension.")
+
+    if wants_async():
+        path = save_upload(file, suffix="." + ext)
+        job_id = uuid.uuid4().hex
+        get_job_queue().submit("extract_images", _extract_images_job, path, ext, job_id, job_id=job_id,
+                               cleanup=lambda: discard_upload(path))
+        return job_accepted(job_id)
+
+    if wants_zip():
+        path = save_upload(file, suffix="." + ext)
+        return zip_download(_zip_extracted(path, ext),
+                            os.path.splitext(os.path.basename(filename))[0] + "_images.zip",
+                            cleanup=lambda: discard_upload(path))
 
     extracted_count = 0
+    file_text = None
+    start = time.perf_counter()
+    budget = Budget()
     try:
-        in_mem = file.read()
-        if ext == 'pptx':
-            with tempfile.TemporaryFile() as tf:
-                tf.write(in_mem)
-                tf.seek(0)
-                extracted_count = extract_images_from_zip(tf, "ppt/media/", output_folder)
-            add_log("info", f"Extracted {extracted_count} images from PPTX.")
-        elif ext == 'docx':
-            with tempfile.TemporaryFile() as tf:
-                tf.write(in_mem)
-                tf.seek(0)
-                extracted_count = extract_images_from_zip(tf, "word/media/", output_folder)
-            add_log("info", f"Extracted {extracted_count} images from DOCX.")
-        elif ext == 'pdf':
-            import io
-            extracted_count = extract_images_from_pdf(io.BytesIO(in_mem), output_folder)
-            add_log("info", f"Extracted {extracted_count} images from PDF.")
-        else:
-            add_log("error", f"Unsupported file extension: {ext}")
-            return render_template_string(
-                HTML_TEMPLATE,
-                logs=ALL_LOGS,
-                file_extract_status="Unsupported file extension.",
-                youtube_status=None,
-                youtube_transcript=None,
-                article_status=None,
-                article_text=None,
-                webpics_status=None,
-            )
+        job_id, sink = new_image_sink()
+        with spool_upload(file, suffix="." + ext) as path:
+            if request.form.get("text"):
+                document = extract_document(path, ext, sink, budget=budget)
+                extracted_count = document["image_count"]
+                file_text = document["text"] or "(no text found)"
+            else:
+                extracted_count = extract_images_from_file(path, ext, sink, budget=budget)
+        add_log("info", f"Extracted {extracted_count} images from {ext.upper()}.{budget_note(budget)}",
+                duration=time.perf_counter() - start)
 
         if extracted_count > 0:
-            file_extract_status = f"Extraction complete. Saved {extracted_count} images in '{output_folder}'."
+            file_extract_status = (f"Extraction complete. Saved {sink.stored_count} images "
+                                   f"(job {job_id}).{duplicates_note(sink)}{budget_note(budget)}")
         else:
             file_extract_status = "No images found or error while extracting."
             add_log("error", f"No images found in file: {filename}.")
-
-        return render_template_string(
-            HTML_TEMPLATE,
-            logs=ALL_LOGS,
-            file_extract_status=file_extract_status,
-            youtube_status=None,
-            youtube_transcript=None,
-            article_status=None,
-            article_text=None,
-            webpics_status=None,
-        )
+        return render_page(file_extract_status=file_extract_status, file_text=file_text)
     except Exception as e:
         msg = f"Error extracting images: {e}"
         add_log("error", msg)
-        return render_template_string(
-            HTML_TEMPLATE,
-            logs=ALL_LOGS,
-            file_extract_status=msg,
-            youtube_status=None,
-            youtube_transcript=None,
-            article_status=None,
-            article_text=None,
-            webpics_status=None,
-        )
+        return render_page(status=500, file_extract_status=msg)
 
 @app.route("/youtube_transcript", methods=["POST"])
 def youtube_transcript():
@@ -522,34 +4200,21 @@ def youtube_transcript():
     """
     url = request.form.get("youtube_url", "")
     if not url:
-        add_log("error", "No YouTube URL provided.")
-        return redirect(url_for("index"))
-    try:
-        transcript_text = get_youtube_transcript(url)
-        add_log("info", f"Fetched transcript from YouTube URL: {url}")
-        return render_template_string(
-            HTML_TEMPLATE,
-            logs=ALL_LOGS,
-            file_extract_status=None,
-            youtube_status="Transcript fetched successfully.",
-            youtube_transcript=transcript_text,
-            article_status=None,
-            article_text=None,
-            webpics_status=None,
-        )
+        return missing_input("No YouTube URL provided.")
+    if wants_async():
+        return job_accepted(get_job_queue().submit("youtube_transcript", _youtube_transcript_job, url))
+    start = time.perf_counter()
+    budget = Budget()
+    try:
+        transcript_text = get_youtube_transcript(url, budget=budget)
+        add_log("info", f"Fetched transcript from YouTube URL: {url}{budget_note(budget)}",
+                duration=time.perf_counter() - start)
+        return render_page(youtube_status=f"Transcript fetched successfully.{budget_note(budget)}",
+                           youtube_transcript=transcript_text)
     except Exception as e:
         msg = f"Error fetching transcript: {e}"
         add_log("error", msg)
-        return render_template_string(
-            HTML_TEMPLATE,
-            logs=ALL_LOGS,
-            file_extract_status=None,
-            youtube_status=msg,
-            youtube_transcript=None,
-            article_status=None,
-            article_text=None,
-            webpics_status=None,
-        )
+        return render_page(status=500, youtube_status=msg)
 
 @app.route("/article_scraper", methods=["POST"])
 def article_scraper():
@@ -558,34 +4223,40 @@ def article_scraper():
     """
     url = request.form.get("article_url", "")
     if not url:
-        add_log("error", "No article URL provided.")
-        return redirect(url_for("index"))
-    try:
-        text = scrape_article(url)
-        add_log("info", f"Scraped article from URL: {url}")
-        return render_template_string(
-            HTML_TEMPLATE,
-            logs=ALL_LOGS,
-            file_extract_status=None,
-            youtube_status=None,
-            youtube_transcript=None,
-            article_status="Successfully scraped article.",
-            article_text=text,
-            webpics_status=None,
-        )
+        return missing_input("No article URL provided.")
+    if wants_async():
+        return job_accepted(get_job_queue().submit("article_scraper", _article_job, url))
+    start = time.perf_counter()
+    budget = Budget()
+    try:
+        text = scrape_article(url, budget=budget)
+        add_log("info", f"Scraped article from URL: {url}{budget_note(budget)}", duration=time.perf_counter() - start)
+        return render_page(article_status=f"Successfully scraped article.{budget_note(budget)}", article_text=text)
     except Exception as e:
         msg = f"Error scraping article: {e}"
         add_log("error", msg)
-        return render_template_string(
-            HTML_TEMPLATE,
-            logs=ALL_LOGS,
-            file_extract_status=None,
-            youtube_status=None,
-            youtube_transcript=None,
-            article_status=msg,
-            article_text=None,
-            webpics_status=None,
-        )
+        return render_page(status=500, article_status=msg)
+
+@app.route("/article_scraper/batch", methods=["POST"])
+def article_scraper_batch():
+    """
+    Scrape a list of article URLs, streaming one NDJSON line per URL as it
+    completes. Accepts {"urls": [...]} or a bare JSON list.
+    """
+    payload = request.get_json(silent=True)
+    urls = payload.get("urls") if isinstance(payload, dict) else payload
+    if not isinstance(urls, list) or not all(isinstance(u, str) for u in urls):
+        return jsonify({"error": "Expected a JSON list of URLs."}), 400
+    urls = [u.strip() for u in urls if u.strip()]
+    if len(urls) > ARTICLE_BATCH_MAX_URLS:
+        return jsonify({"error": f"At most {ARTICLE_BATCH_MAX_URLS} URLs per batch."}), 413
+    add_log("info", f"Batch scraping {len(urls)} article URLs.")
+
+    def generate():
+        for result in scrape_articles(urls):
+            yield json.dumps(result) + "\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
 
 @app.route("/internet_images", methods=["POST"])
 def internet_images():
@@ -594,41 +4265,390 @@ def internet_images():
     """
     url = request.form.get("website_url", "")
     if not url:
-        add_log("error", "No website URL provided.")
-        return redirect(url_for("index"))
-    output_folder = "scraped_images"
-    os.makedirs(output_folder, exist_ok=True)
-    try:
-        downloaded_count = scrape_images(url, output_folder=output_folder)
-        msg = f"Scraped {downloaded_count} images from {url} into '{output_folder}'."
-        add_log("info", msg)
-        return render_template_string(
-            HTML_TEMPLATE,
-            logs=ALL_LOGS,
-            file_extract_status=None,
-            youtube_status=None,
-            youtube_transcript=None,
-            article_status=None,
-            article_text=None,
-            webpics_status=msg,
-        )
+        return missing_input("No website URL provided.")
+    if wants_async():
+        job_id = uuid.uuid4().hex
+        get_job_queue().submit("internet_images", _internet_images_job, url, job_id, job_id=job_id)
+        return job_accepted(job_id)
+    if wants_zip():
+        return zip_download(_zip_scraped(url), "scraped_images.zip", concurrent=True)
+    start = time.perf_counter()
+    budget = Budget()
+    try:
+        job_id, sink = new_image_sink()
+        scrape_images(url, output_folder=sink, budget=budget)
+        msg = (f"Scraped {sink.stored_count} images from {url} (job {job_id})."
+               f"{duplicates_note(sink)}{budget_note(budget)}")
+        add_log("info", msg, duration=time.perf_counter() - start)
+        return render_page(webpics_status=msg)
     except Exception as e:
         msg = f"Error scraping images: {e}"
         add_log("error", msg)
-        return render_template_string(
-            HTML_TEMPLATE,
-            logs=ALL_LOGS,
-            file_extract_status=None,
-            youtube_status=None,
-            youtube_transcript=None,
-            article_status=None,
-            article_text=None,
-            webpics_status=msg,
-        )
+        return render_page(status=500, webpics_status=msg)
+
+@app.route("/logs", methods=["GET"])
+def logs():
+    """
+    Page through log entries: /logs?since=<seq>&limit=<n>. Without since,
+    the most recent entries are returned. Pass the returned "next" value as
+    since to fetch only newer entries.
+    """
+    try:
+        limit = int(request.args.get("limit", LOG_RENDER_LIMIT))
+        since = request.args.get("since")
+        since = None if since is None else int(since)
+    except ValueError:
+        return jsonify({"error": "since and limit must be integers."}), 400
+    limit = min(max(limit, 1), LOG_CAPACITY)
+    entries = LOGS.recent(limit) if since is None else LOGS.since(since, limit)
+    next_seq = entries[-1].seq if entries else since
+    return jsonify({"entries": [entry.to_dict() for entry in entries], "next": next_seq})
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """
+    Report the status of a background job (without its result, but saying
+    whether it was truncated).
+    """
+    job = get_job_queue().store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job."}), 404
+    result = job.pop("result", None)
+    if isinstance(result, dict) and "truncated" in result:
+        job["truncated"] = result["truncated"]
+    return jsonify(job)
+
+@app.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    """
+    Cancel a queued or running background job. It stops at its next budget
+    check and ends as "cancelled", keeping any partial result.
+    """
+    jobs = get_job_queue()
+    job = jobs.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job."}), 404
+    if not jobs.cancel(job_id):
+        return jsonify({"id": job_id, "status": job["status"], "error": "Job has already finished."}), 409
+    add_log("info", f"Cancelling job {job_id} ({job['kind']}).")
+    return jsonify({"id": job_id, "status": "cancelling"}), 202
+
+@app.route("/jobs/<job_id>/manifest", methods=["GET"])
+def job_manifest(job_id):
+    """
+    List the images a job stored, from the image store index. Works for
+    synchronous requests too, using the job id shown in their status.
+    """
+    return jsonify({"job_id": job_id, "items": get_image_store().job_manifest(job_id)})
+
+@app.route("/images/<sha256>", methods=["GET"])
+def stored_image(sha256):
+    """
+    Serve a stored image by its content hash.
+    """
+    path = get_image_store().find(sha256) if re.fullmatch(r"[0-9a-f]{64}", sha256) else None
+    if path is None:
+        return jsonify({"error": "Unknown image."}), 404
+    return send_file(os.path.abspath(path), conditional=True, max_age=ASSET_MAX_AGE)
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    """
+    Return the result of a finished (or cancelled) job, or 409 while it is
+    still pending.
+    """
+    job = get_job_queue().store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job."}), 404
+    if job["status"] == "error":
+        return jsonify({"id": job_id, "status": "error", "error": job["error"]}), 500
+    if job["status"] not in ("done", "cancelled"):
+        return jsonify({"id": job_id, "status": job["status"]}), 409
+    return jsonify({"id": job_id, "status": job["status"], "result": job["result"]})
+
+################################################################################
+#  JSON API (v1)
+#  Structured results for programmatic clients. Endpoints take a JSON body
+#  (or form fields) and return JSON; list-shaped results are streamed as
+#  NDJSON, one item per line, when the client sends ?stream=1 or
+#  Accept: application/x-ndjson.
+################################################################################
+def api_param(name):
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict) and payload.get(name) is not None:
+        return str(payload[name]).strip()
+    return request.values.get(name, "").strip()
+
+def api_error(message, status):
+    add_log("error", message)
+    return jsonify({"error": message}), status
+
+def wants_ndjson():
+    if request.args.get("stream", "").lower() in ("1", "true", "yes"):
+        return True
+    return request.accept_mimetypes.best == "application/x-ndjson"
+
+def wants_event_stream():
+    if request.args.get("stream", "").lower() == "sse":
+        return True
+    return request.accept_mimetypes.best == "text/event-stream"
+
+def sse_message(event, data):
+    """
+    One Server-Sent Events message carrying data as JSON.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def event_stream(events, cleanup=None, **start):
+    """
+    Stream an extraction generator as Server-Sent Events: a "start"
+    message (with the start fields), one "progress" message per event, then
+    "done" with the event count or "error". When the client goes away the
+    response iterator is closed, which closes events and so stops the work
+    mid-way. cleanup() is called on close even if generate() never
+    started.
+    """
+    def generate():
+        count = 0
+        finished = False
+        try:
+            yield sse_message("start", start)
+            try:
+                for event in events:
+                    count += 1
+                    yield sse_message("progress", event)
+            except Exception as e:
+                add_log("error", f"Error while streaming events: {e}")
+                yield sse_message("error", {"error": str(e)})
+            else:
+                yield sse_message("done", {"events": count})
+            finished = True
+        finally:
+            events.close()
+            if not finished:
+                add_log("info", f"Client cancelled after {count} events; stopped the extraction.")
+
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    if cleanup is not None:
+        response.call_on_close(cleanup)
+    return response
+
+def list_response(items, **summary):
+    """
+    Return items either inside a JSON object (with summary fields) or, for
+    NDJSON clients, as a stream of one JSON document per line.
+    """
+    if wants_ndjson():
+        return Response((json.dumps(item) + "\n" for item in items), mimetype="application/x-ndjson")
+    summary["items"] = list(items)
+    return jsonify(summary)
+
+@app.route("/api/v1/article", methods=["POST"])
+def api_article():
+    """
+    {"url": ...} -> {"url", "title", "byline", "published", "text", "budget"},
+    where budget (a Budget report) says whether the whole page was read.
+    """
+    url = api_param("url")
+    if not url:
+        return api_error("No article URL provided.", 400)
+    budget = Budget()
+    try:
+        article = fetch_article(url, budget=budget)
+    except Exception as e:
+        return api_error(f"Error scraping article: {e}", 502)
+    return jsonify(dict(article, url=url, budget=budget.report()))
+
+@app.route("/api/v1/transcript", methods=["POST"])
+def api_transcript():
+    """
+    {"url": ..., "start": s, "end": s, "format": "json|srt|vtt"}
+    -> {"video_id", "items": [{"text", "start", "duration"}, ...]},
+    or the transcript as SRT/WebVTT. start/end limit it to a time range.
+    """
+    url = api_param("url")
+    video_id = extract_video_id(url) if url else None
+    if not video_id:
+        return api_error("No valid YouTube URL provided.", 400)
+    try:
+        start = float(api_param("start")) if api_param("start") else None
+        end = float(api_param("end")) if api_param("end") else None
+    except ValueError:
+        return api_error("start and end must be numbers of seconds.", 400)
+    budget = Budget()
+    try:
+        transcript = fetch_transcript(url, budget=budget).between(start, end)
+    except Exception as e:
+        return api_error(f"Error fetching transcript: {e}", 502)
+    fmt = api_param("format").lower()
+    if fmt == "srt":
+        return Response(transcript.to_srt(), mimetype="application/x-subrip")
+    if fmt == "vtt":
+        return Response(transcript.to_vtt(), mimetype="text/vtt")
+    return list_response(iter(transcript), video_id=video_id, budget=budget.report())
+
+@app.route("/api/v1/transcripts", methods=["POST"])
+def api_transcripts():
+    """
+    {"urls": [...], "languages": [...]} -> one result per distinct video,
+    as they complete. A single language may be given as a string.
+    """
+    payload = request.get_json(silent=True) or {}
+    urls = payload.get("urls")
+    if not isinstance(urls, list) or not all(isinstance(u, str) for u in urls):
+        return api_error("Expected a JSON list of URLs.", 400)
+    if len(urls) > TRANSCRIPT_BATCH_MAX_URLS:
+        return api_error(f"At most {TRANSCRIPT_BATCH_MAX_URLS} URLs per batch.", 413)
+    languages = payload.get("languages") or None
+    if isinstance(languages, str):
+        languages = [languages]
+    if languages is not None and (not isinstance(languages, list)
+                                  or not all(isinstance(lang, str) and lang for lang in languages)):
+        return api_error("languages must be a list of language codes.", 400)
+    return list_response(fetch_youtube_transcripts(urls, languages), count=len(urls))
+
+@app.route("/api/v1/images/extract", methods=["POST"])
+def api_extract_images():
+    """
+    Multipart upload of a .pdf/.pptx/.docx ("file") -> image manifest, or
+    the images themselves as a streamed ZIP with download=zip. With
+    Accept: text/event-stream (or ?stream=sse) progress is sent as
+    Server-Sent Events, one per PDF page or media member; disconnecting
+    cancels the extraction.
+    """
+    file = request.files.get("file")
+    if file is None or file.filename == "":
+        return api_error("No file uploaded.", 400)
+    ext = os.path.splitext(file.filename.lower())[1].lstrip(".")
+    if ext not in SUPPORTED_UPLOADS:
+        return api_error(f"Unsupported file extension: {ext}", 415)
+    if wants_zip(api_param("download")):
+        path = save_upload(file, suffix="." + ext)
+        return zip_download(_zip_extracted(path, ext), "images.zip", cleanup=lambda: discard_upload(path))
+    job_id, sink = new_image_sink()
+    if wants_event_stream():
+        path = save_upload(file, suffix="." + ext)
+        return event_stream(iter_images_from_file(path, ext, sink), cleanup=lambda: discard_upload(path),
+                            job_id=job_id, manifest_url=url_for("job_manifest", job_id=job_id))
+    budget = Budget()
+    try:
+        with spool_upload(file, suffix="." + ext) as path:
+            count = extract_images_from_file(path, ext, sink, budget=budget)
+    except Exception as e:
+        return api_error(f"Error extracting images: {e}", 500)
+    add_log("info", f"Extracted {count} images from {ext.upper()} via API.{budget_note(budget)}")
+    return list_response(sink.manifest, job_id=job_id, count=count, stored=sink.stored_count,
+                         budget=budget.report())
+
+@app.route("/api/v1/documents", methods=["POST"])
+def api_document():
+    """
+    Multipart upload of a .pdf/.pptx/.docx ("file") -> its metadata, text
+    and images in one pass: {"format", "metadata", "text", "units",
+    "image_count", "job_id"}. NDJSON clients get the iter_document events
+    one per line as each page/slide/paragraph is read; event-stream
+    clients get them as Server-Sent Events.
+    """
+    file = request.files.get("file")
+    if file is None or file.filename == "":
+        return api_error("No file uploaded.", 400)
+    ext = os.path.splitext(file.filename.lower())[1].lstrip(".")
+    if ext not in DOCUMENT_READERS:
+        return api_error(f"Unsupported file extension: {ext}", 415)
+    job_id, sink = new_image_sink()
+    if wants_event_stream():
+        path = save_upload(file, suffix="." + ext)
+        return event_stream(iter_document(path, ext, sink), cleanup=lambda: discard_upload(path),
+                            job_id=job_id)
+    if wants_ndjson():
+        path = save_upload(file, suffix="." + ext)
+
+        def generate():
+            events = iter_document(path, ext, sink)
+            try:
+                for event in events:
+                    yield json.dumps(event) + "\n"
+            finally:
+                events.close()
+
+        response = Response(generate(), mimetype="application/x-ndjson")
+        response.headers["X-Job-Id"] = job_id
+        response.call_on_close(lambda: discard_upload(path))
+        return response
+    try:
+        with spool_upload(file, suffix="." + ext) as path:
+            document = extract_document(path, ext, sink)
+    except Exception as e:
+        return api_error(f"Error reading document: {e}", 500)
+    add_log("info", f"Extracted text and {document['image_count']} images from {ext.upper()} via API."
+                    f"{'' if document['budget']['complete'] else ' Results are partial.'}")
+    return jsonify(dict(document, job_id=job_id))
+
+@app.route("/api/v1/images/scrape", methods=["POST"])
+def api_scrape_images():
+    """
+    {"url": ...} -> image manifest of the images saved from that page, or
+    {"url": ..., "download": "zip"} -> the images as a streamed ZIP.
+    """
+    url = api_param("url")
+    if not url:
+        return api_error("No website URL provided.", 400)
+    if wants_zip(api_param("download")):
+        return zip_download(_zip_scraped(url), "images.zip", concurrent=True)
+    job_id, sink = new_image_sink()
+    budget = Budget()
+    try:
+        count = scrape_images(url, output_folder=sink, budget=budget)
+    except Exception as e:
+        return api_error(f"Error scraping images: {e}", 502)
+    add_log("info", f"Scraped {count} images from {url} via API.{budget_note(budget)}")
+    return list_response(sink.manifest, job_id=job_id, url=url, count=count, stored=sink.stored_count,
+                         budget=budget.report())
+
+@app.route("/api/v1/crawl", methods=["POST"])
+def api_crawl():
+    """
+    {"url": ..., "mode": "article|images|both", "max_pages": n, "max_depth": n,
+     "scope": url_prefix, "same_domain": true} -> one result per page as
+    it is crawled. Images go to the image store under the returned job_id.
+    Crawls of more than CRAWL_API_SYNC_MAX_PAGES pages that are not
+    streamed as NDJSON, and any with "async": true, run as a background
+    job instead (202 with the job's URLs).
+    """
+    url = api_param("url")
+    if not url:
+        return api_error("No start URL provided.", 400)
+    mode = api_param("mode").lower() or "article"
+    if mode not in CRAWL_MODES:
+        return api_error(f"Unknown crawl mode: {mode}", 400)
+    try:
+        max_pages = int(api_param("max_pages") or CRAWL_MAX_PAGES)
+        max_depth = int(api_param("max_depth") or CRAWL_MAX_DEPTH)
+    except ValueError:
+        return api_error("max_pages and max_depth must be integers.", 400)
+    if not 0 < max_pages <= CRAWL_API_MAX_PAGES:
+        return api_error(f"max_pages must be between 1 and {CRAWL_API_MAX_PAGES}.", 413)
+    same_domain = api_param("same_domain").lower() not in ("0", "false", "no")
+    options = {"mode": mode, "max_pages": max_pages, "max_depth": max_depth,
+               "same_domain": same_domain, "scope": api_param("scope") or None}
+    add_log("info", f"Crawling {url} (mode {mode}, up to {max_pages} pages).")
+    run_async = api_param("async").lower() in ("1", "true", "yes")
+    if run_async or (max_pages > CRAWL_API_SYNC_MAX_PAGES and not wants_ndjson()):
+        job_id = uuid.uuid4().hex
+        get_job_queue().submit("crawl", _crawl_job, url, job_id, job_id=job_id,
+                               budget=crawl_budget(max_pages), **options)
+        return job_accepted(job_id)
+    job_id, sink = new_image_sink() if mode != "article" else (None, None)
+    results = crawl(url, output_folder=sink, budget=crawl_budget(max_pages), **options)
+    response = list_response(results, url=url, job_id=job_id)
+    if job_id:
+        response.headers["X-Job-Id"] = job_id
+    return response
 
 ################################################################################
 if __name__ == "__main__":
-    # Make sure folders exist for storing extracted images
-    os.makedirs("extracted_images", exist_ok=True)
-    os.makedirs("scraped_images", exist_ok=True)
+    # Make sure the image store exists before the first request
+    get_image_store()
     app.run(debug=True)